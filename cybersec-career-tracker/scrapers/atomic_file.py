@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""Crash-safe file writes shared by the exporters, metrics and backfill state"""
+
+import os
+import tempfile
+
+
+def atomic_write(path: str, data: bytes):
+    """Write bytes to path via a temp file + rename, so readers never see a partial file"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
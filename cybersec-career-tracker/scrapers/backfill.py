@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+CyberTrack Backfill
+Imports historical articles from JSONL dumps, OPML feed lists and
+paginated feeds/sitemaps in fixed-size, checkpointed chunks
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+from xml.etree import ElementTree
+
+from atomic_file import atomic_write
+from extractor import fetch_page
+from fetcher import FetchEngine, host_of
+from http_client import get_session, request, reset_retry_budget
+from metrics import ARTICLES_WRITTEN, ENTRIES_PARSED, ERRORS, write_metrics
+from seen_index import SeenIndex
+from storage import open_sink
+from timeline import entry_timestamp, parse_timestamp
+
+BACKFILL_CHUNK_SIZE = int(os.getenv('BACKFILL_CHUNK_SIZE', '500'))
+BACKFILL_MAX_PAGES = int(os.getenv('BACKFILL_MAX_PAGES', '100'))
+BACKFILL_STATE_PATH = os.getenv('BACKFILL_STATE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.backfill_state.json'))
+
+Cursor = Dict
+Record = Dict
+
+
+class Checkpoint:
+    """Per-input resume cursors, rewritten atomically after every chunk.
+
+    A cursor is only saved once its chunk is stored, so a crash replays at
+    most one chunk; article IDs come from the URL, so the replay overwrites
+    the same documents instead of duplicating them.
+    """
+
+    def __init__(self, path: str = BACKFILL_STATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self._state: Dict[str, Dict] = json.load(f)
+        except FileNotFoundError:
+            self._state = {}
+        except (OSError, ValueError) as e:
+            print(f"  ⚠️ Ignoring unreadable checkpoint {path}: {e}")
+            self._state = {}
+
+    def get(self, key: str) -> Dict:
+        with self._lock:
+            return dict(self._state.get(key, {}))
+
+    def save(self, key: str, cursor: Optional[Cursor] = None, done: bool = False, imported: int = 0):
+        with self._lock:
+            state = self._state.setdefault(key, {'imported': 0})
+            if cursor is not None:
+                state['cursor'] = cursor
+            state['done'] = done
+            state['imported'] += imported
+            state['updatedAt'] = time.time()
+            atomic_write(self.path, json.dumps(self._state, indent=2).encode('utf-8'))
+
+    def reset(self, key: str):
+        with self._lock:
+            self._state.pop(key, None)
+
+
+def _fetch_bytes(url: str) -> bytes:
+    response = request('GET', url)
+    response.raise_for_status()
+    content = response.content
+    if content[:2] == b'\x1f\x8b':  # sitemap.xml.gz served without Content-Encoding
+        content = gzip.decompress(content)
+    return content
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+class JsonlInput:
+    """Articles from a JSON Lines dump (e.g. a --sink=jsonl output file).
+
+    The cursor is a byte offset, so a resume seeks straight to it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.key = f"jsonl:{os.path.abspath(path)}"
+
+    def read(self, cursor: Cursor) -> Iterator[Tuple[Record, Cursor]]:
+        opener = gzip.open if self.path.endswith('.gz') else open
+        with opener(self.path, 'rb') as f:
+            offset = cursor.get('offset', 0)
+            f.seek(offset)
+            for line in iter(f.readline, b''):
+                offset += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    if line.strip():
+                        ERRORS.inc(source=self.path, stage='parse')
+                    continue
+                if isinstance(record, dict) and record.get('url'):
+                    yield record, {'offset': offset}
+
+
+class FeedInput:
+    """Every entry of a feed, following its archive pages.
+
+    Pages are found through an RFC 5005 rel="next" link, or else the
+    WordPress-style ?paged=N parameter, until a page is empty or repeats.
+    """
+
+    def __init__(self, url: str, name: Optional[str] = None, max_pages: int = BACKFILL_MAX_PAGES):
+        self.url = url
+        self.name = name or host_of(url)
+        self.max_pages = max_pages
+        self.key = f"feed:{url}"
+
+    def _page_url(self, page: int) -> str:
+        parts = urlparse(self.url)
+        query = dict(parse_qsl(parts.query), paged=str(page))
+        return urlunparse(parts._replace(query=urlencode(query)))
+
+    def read(self, cursor: Cursor) -> Iterator[Tuple[Record, Cursor]]:
+        import feedparser
+
+        page = cursor.get('page', 1)
+        url = cursor.get('url', self.url)
+        skip = cursor.get('index', 0)
+        previous_links = None
+        while url and page <= self.max_pages:
+            try:
+                feed = feedparser.parse(_fetch_bytes(url))
+            except Exception as e:
+                if page == 1:
+                    raise
+                print(f"  ⏹️ {self.name}: stopping at page {page} ({e})")
+                return
+            links = [entry.get('link') for entry in feed.entries]
+            if not feed.entries or links == previous_links:
+                return
+            previous_links = links
+
+            following = next((link.get('href') for link in feed.feed.get('links', [])
+                              if link.get('rel') == 'next'), None) or self._page_url(page + 1)
+            for index, entry in enumerate(feed.entries[skip:], skip + 1):
+                timestamp = entry_timestamp(entry)
+                yield {
+                    'title': entry.get('title', 'No Title'),
+                    'url': entry.get('link', ''),
+                    'summary': entry.get('summary', entry.get('description', '')),
+                    'publishedDate': timestamp,
+                    'sourceName': self.name,
+                    'sourceWebsite': self.url,
+                }, {'page': page, 'url': url, 'index': index}
+            page, url, skip = page + 1, following, 0
+
+
+class SitemapInput:
+    """Article URLs from a sitemap, sitemap index or paginated sitemaps.
+
+    A URL containing {page} is expanded to page 1, 2, ... until a page is
+    missing. Google News <news:title> is used when present; otherwise the
+    title comes from the article page itself.
+    """
+
+    def __init__(self, url: str, name: Optional[str] = None, max_pages: int = BACKFILL_MAX_PAGES):
+        self.url = url
+        self.name = name or host_of(url)
+        self.max_pages = max_pages
+        self.key = f"sitemap:{url}"
+
+    def _sitemaps(self, first_page: int = 1) -> Iterator[Tuple[int, str, Optional[bytes]]]:
+        """(page, URL, body or None) of every leaf sitemap, in a stable order.
+
+        page is the {page} number the sitemap came from (1 without {page}).
+        Sitemaps listed in an index are not downloaded here, so a resumed
+        import skips the finished ones without fetching them.
+        """
+        if '{page}' not in self.url:
+            for url, content in self._expand(self.url, _fetch_bytes(self.url)):
+                yield 1, url, content
+            return
+        for page in range(first_page, self.max_pages + 1):
+            url = self.url.replace('{page}', str(page))
+            try:
+                content = _fetch_bytes(url)
+            except Exception:
+                return
+            for leaf, leaf_content in self._expand(url, content):
+                yield page, leaf, leaf_content
+
+    def _expand(self, url: str, content: bytes) -> Iterator[Tuple[str, Optional[bytes]]]:
+        root = ElementTree.fromstring(content)
+        if _local_name(root.tag) != 'sitemapindex':
+            yield url, content
+            return
+        # Indexes may only list leaf sitemaps (sitemaps.org), so children are not expanded
+        for child in root:
+            loc = next((el.text for el in child if _local_name(el.tag) == 'loc' and el.text), None)
+            if loc:
+                yield loc.strip(), None
+
+    def _urls(self, content: bytes) -> Iterator[Record]:
+        for element in ElementTree.fromstring(content):
+            fields = {}
+            for node in element.iter():
+                name = _local_name(node.tag)
+                if name in ('loc', 'lastmod', 'title', 'publication_date') and node.text and name not in fields:
+                    fields[name] = node.text.strip()
+            if fields.get('loc'):
+                yield {
+                    'title': fields.get('title', ''),
+                    'url': fields['loc'],
+                    'summary': '',
+                    'publishedDate': parse_timestamp(fields.get('publication_date') or fields.get('lastmod')),
+                    'sourceName': self.name,
+                    'sourceWebsite': f"https://{host_of(self.url)}",
+                    'fetchPage': True,
+                }
+
+    def read(self, cursor: Cursor) -> Iterator[Tuple[Record, Cursor]]:
+        first_page, start, skip = cursor.get('page', 1), cursor.get('sitemap', 0), cursor.get('index', 0)
+        current, number = None, 0
+        for page, url, content in self._sitemaps(first_page):
+            # Sitemaps are numbered within their {page}
+            number = number + 1 if page == current else 0
+            current = page
+            if page == first_page and number < start:
+                continue
+            records = list(self._urls(content if content is not None else _fetch_bytes(url)))
+            for index, record in enumerate(records[skip:], skip + 1):
+                yield record, {'page': page, 'sitemap': number, 'index': index}
+            skip = 0
+
+
+def opml_inputs(location: str, max_pages: int = BACKFILL_MAX_PAGES) -> List[FeedInput]:
+    """One FeedInput per <outline xmlUrl=...> in an OPML file or URL"""
+    if re.match(r'https?://', location):
+        content = _fetch_bytes(location)
+    else:
+        with open(location, 'rb') as f:
+            content = f.read()
+    inputs = []
+    for outline in ElementTree.fromstring(content).iter('outline'):
+        url = outline.get('xmlUrl')
+        if url:
+            inputs.append(FeedInput(url, outline.get('title') or outline.get('text'), max_pages))
+    return inputs
+
+
+def resolve_inputs(locations: List[str], max_pages: int = BACKFILL_MAX_PAGES,
+                   source_name: Optional[str] = None) -> List:
+    """Turn CLI arguments into inputs; a `jsonl:`, `opml:`, `feed:` or `sitemap:` prefix forces the kind"""
+    inputs = []
+    for location in locations:
+        kind, _, rest = location.partition(':')
+        if kind in ('jsonl', 'opml', 'feed', 'sitemap') and rest:
+            location = rest
+        else:
+            lower = location.lower()
+            if lower.endswith(('.jsonl', '.jsonl.gz', '.ndjson')):
+                kind = 'jsonl'
+            elif lower.endswith('.opml'):
+                kind = 'opml'
+            elif 'sitemap' in lower or '{page}' in location:
+                kind = 'sitemap'
+            else:
+                kind = 'feed'
+
+        if kind == 'jsonl':
+            inputs.append(JsonlInput(location))
+        elif kind == 'opml':
+            inputs.extend(opml_inputs(location, max_pages))
+        elif kind == 'sitemap':
+            inputs.append(SitemapInput(location, source_name, max_pages))
+        else:
+            inputs.append(FeedInput(location, source_name, max_pages))
+    return inputs
+
+
+class Backfill:
+    """Reads inputs in chunks, enriches them like rss_scraper and writes each
+    chunk in bulk before moving its checkpoint forward"""
+
+    def __init__(self, sink: str = 'rest', jsonl_path: Optional[str] = None,
+                 chunk_size: int = BACKFILL_CHUNK_SIZE, checkpoint: Optional[Checkpoint] = None):
+        self.sink = sink
+        self.chunk_size = max(1, chunk_size)
+        self.checkpoint = checkpoint or Checkpoint()
+        self.engine = FetchEngine()
+        # Written synchronously: the checkpoint may only move once a chunk is stored
+        self.store = open_sink(sink, path=jsonl_path)
+        self.seen = SeenIndex(self.store.seen_index_path)
+
+    def _chunks(self, source, cursor: Cursor) -> Iterator[Tuple[List[Record], Cursor]]:
+        chunk: List[Record] = []
+        for record, cursor in source.read(cursor):
+            chunk.append(record)
+            if len(chunk) >= self.chunk_size:
+                yield chunk, cursor
+                chunk = []
+        if chunk:
+            yield chunk, cursor
+
+    def _fill_pages(self, records: List[Record]):
+        """Fetch title/content for records that only have a URL (sitemaps)"""
+        pending = [record for record in records if record.get('fetchPage')]
+        if not pending:
+            return
+        from sources.bleeping_computer import ARTICLE_TIMEOUT
+
+        pages = self.engine.map(lambda record: fetch_page(get_session(), record['url'], ARTICLE_TIMEOUT),
+                                pending, url_of=lambda record: record['url'], default=None)
+        for record, page in zip(pending, pages):
+            if page is None:
+                ERRORS.inc(source=record['sourceName'], stage='backfill_page')
+                continue
+            record['title'] = record['title'] or page['title']
+            record['fullContent'] = page['content']
+            record['imageUrl'] = page['imageUrl']
+            record['summary'] = page['content'][:500]
+
+    def _articles(self, records: List[Record]) -> List[Dict]:
+        from rss_scraper import build_article, categorize_articles, generate_article_id
+
+        # Skip what is already stored before spending any page fetches on it
+        by_id = {generate_article_id(record['url']): record for record in records}
+        stored = self.seen.contains_many(by_id)
+        records = [record for article_id, record in by_id.items() if article_id not in stored]
+        self._fill_pages(records)
+
+        articles = []
+        for record in records:
+            if not record.get('title'):
+                continue
+            published = parse_timestamp(record.get('publishedDate')) or time.time()
+            article = build_article(record['title'], record['url'], record.get('summary') or '', published,
+                                    record.get('sourceName') or host_of(record['url']),
+                                    record.get('sourceWebsite') or f"https://{host_of(record['url'])}",
+                                    record.get('primaryCategory') or 'News', record.get('severity') or 'Medium')
+            for field in ('author', 'fullContent', 'imageUrl'):
+                if record.get(field):
+                    article[field] = record[field]
+            article['trending'] = False  # Historical coverage is outside every trending window
+            articles.append(article)
+            ENTRIES_PARSED.inc(source=article['sourceName'])
+        categorize_articles(articles)
+        return articles
+
+    def _write(self, articles: List[Dict]) -> int:
+        if not articles:
+            return 0
+        written_ids, _ = self.store.write(articles)
+        self.seen.add_many(written_ids)
+        ARTICLES_WRITTEN.inc(len(written_ids), sink=self.store.name)
+        return len(written_ids)
+
+    def run_input(self, source, restart: bool = False) -> int:
+        if restart:
+            self.checkpoint.reset(source.key)
+        state = self.checkpoint.get(source.key)
+        if state.get('done'):
+            print(f"⏭️ {source.key} already imported ({state.get('imported', 0)} articles)")
+            return 0
+
+        print(f"📥 Backfilling {source.key}" + (" (resuming)" if state.get('cursor') else ''))
+        imported = 0
+        started = time.time()
+        for records, cursor in self._chunks(source, state.get('cursor', {})):
+            reset_retry_budget()  # Each chunk is a run's worth of requests
+            written = self._write(self._articles(records))
+            self.checkpoint.save(source.key, cursor, imported=written)
+            imported += written
+            elapsed = max(time.time() - started, 1e-6)
+            print(f"  ✅ Chunk of {len(records)}: {written} new ({imported} total, {imported / elapsed:.0f}/s)")
+        self.checkpoint.save(source.key, done=True)
+        return imported
+
+    def run(self, inputs: List, restart: bool = False) -> int:
+        total = 0
+        for source in inputs:
+            try:
+                total += self.run_input(source, restart)
+            except Exception as e:
+                # The checkpoint still points after the last stored chunk
+                ERRORS.inc(source=source.key, stage='backfill')
+                print(f"  ❌ {source.key} stopped: {e} (rerun to resume)")
+        return total
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Import historical articles in resumable chunks")
+    parser.add_argument('inputs', nargs='+',
+                        help="JSONL dumps, OPML files, feed URLs or sitemap URLs "
+                             "(prefix with jsonl:, opml:, feed: or sitemap: to force the kind)")
+    parser.add_argument('--sink', choices=('rest', 'jsonl'), default='rest',
+                        help="Firestore REST batch writes, or the local JSONL file")
+    parser.add_argument('--jsonl-path', default=None, help="Output file for --sink=jsonl")
+    parser.add_argument('--chunk-size', type=int, default=BACKFILL_CHUNK_SIZE)
+    parser.add_argument('--max-pages', type=int, default=BACKFILL_MAX_PAGES,
+                        help="Archive pages to follow per feed or paginated sitemap")
+    parser.add_argument('--source-name', default=None, help="Source name for feed/sitemap inputs")
+    parser.add_argument('--state', default=BACKFILL_STATE_PATH, help="Checkpoint file")
+    parser.add_argument('--restart', action='store_true', help="Ignore saved checkpoints for these inputs")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    print("=" * 60)
+    print("  CyberTrack Backfill")
+    print("=" * 60)
+
+    inputs = resolve_inputs(args.inputs, args.max_pages, args.source_name)
+    backfill = Backfill(args.sink, args.jsonl_path, args.chunk_size, Checkpoint(args.state))
+    started = time.time()
+    total = backfill.run(inputs, args.restart)
+    write_metrics()
+
+    print(f"\n📊 Imported {total} articles from {len(inputs)} inputs in {time.time() - started:.1f}s")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
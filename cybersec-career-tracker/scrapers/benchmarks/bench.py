@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Offline benchmarks for the scraper's parse, enrich, dedupe and serialize stages.
+
+Inputs come from recorded fixtures in benchmarks/fixtures (see
+record_fixtures.py); when none are recorded, deterministic synthetic feeds
+and article pages are generated instead. Nothing touches the network.
+
+    python benchmarks/bench.py --sizes 10,100,1000 --output results.json
+    python benchmarks/bench.py --baseline benchmarks/baseline.json       # compare
+    python benchmarks/bench.py --save-baseline benchmarks/baseline.json  # record
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+import feedparser
+from deduplicator import ArticleDeduplicator, generate_article_id
+from rss_scraper import convert_to_firestore_format, detect_industry, extract_cve
+from sources.bleeping_computer import BleepingComputerScraper
+
+FIXTURES_DIR = os.path.join(BENCH_DIR, 'fixtures')
+
+WORDS = ("ransomware attack hits hospital bank university cloud patch zero-day exploit "
+         "vulnerability microsoft google federal agency breach data leak phishing malware "
+         "payment crypto student retail store software critical update researchers warn").split()
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def synthetic_feed(rng: random.Random, items: int) -> bytes:
+    entries = []
+    for i in range(items):
+        cve = f" CVE-2024-{rng.randint(1000, 99999)}" if rng.random() < 0.3 else ''
+        entries.append(
+            f"<item><title>{_sentence(rng, 9).title()}{cve}</title>"
+            f"<link>https://www.example.com/news/security/{i}-{rng.randint(0, 10**6)}/</link>"
+            f"<description><![CDATA[<p>{_sentence(rng, 60)}</p>]]></description>"
+            f"<pubDate>Mon, {1 + i % 28:02d} Jan 2024 {i % 24:02d}:00:00 +0000</pubDate>"
+            f"<category>Security</category><dc:creator>Staff</dc:creator></item>"
+        )
+    return ('<?xml version="1.0" encoding="UTF-8"?><rss version="2.0" '
+            'xmlns:dc="http://purl.org/dc/elements/1.1/"><channel><title>Synthetic</title>'
+            + ''.join(entries) + '</channel></rss>').encode('utf-8')
+
+
+def synthetic_article(rng: random.Random) -> bytes:
+    nav = ''.join(f'<li><a href="/{w}">{w}</a></li>' for w in WORDS)
+    body = ''.join(f'<p>{_sentence(rng, 80)}</p>' for _ in range(25))
+    sidebar = ''.join(f'<div class="related"><a href="/x/{i}">{_sentence(rng, 8)}</a></div>' for i in range(60))
+    scripts = '<script>' + 'var x=1;' * 2000 + '</script>'
+    return (f'<!DOCTYPE html><html><head><title>t</title>'
+            f'<meta property="og:image" content="https://img.example.com/{rng.randint(0, 999)}.jpg">'
+            f'{scripts}</head><body><nav><ul>{nav}</ul></nav>'
+            f'<div class="article_section"><div class="articleBody">{body}</div></div>'
+            f'<aside>{sidebar}</aside><footer>{_sentence(rng, 40)}</footer></body></html>').encode('utf-8')
+
+
+def load_fixtures(rng: random.Random) -> Dict[str, List[bytes]]:
+    """Recorded fixtures if present, synthetic ones otherwise"""
+    def read_all(pattern):
+        paths = sorted(glob.glob(os.path.join(FIXTURES_DIR, pattern)))
+        result = []
+        for path in paths:
+            with open(path, 'rb') as f:
+                result.append(f.read())
+        return result
+
+    feeds = read_all('feeds/*.xml')
+    articles = read_all('articles/*.html')
+    return {
+        'source': 'recorded' if feeds and articles else 'synthetic',
+        'feeds': feeds or [synthetic_feed(rng, 25) for _ in range(5)],
+        'articles': articles or [synthetic_article(rng) for _ in range(5)],
+    }
+
+
+def feed_of_size(fixtures: Dict, size: int) -> bytes:
+    """Build one RSS document with `size` items by replaying recorded items"""
+    items = []
+    for raw in fixtures['feeds']:
+        text = raw.decode('utf-8', errors='replace')
+        start = text.find('<item')
+        while start != -1 and len(items) < size:
+            end = text.find('</item>', start)
+            if end == -1:
+                break
+            items.append(text[start:end + len('</item>')])
+            start = text.find('<item', end)
+    if not items:
+        return synthetic_feed(random.Random(size), size)
+    items = [items[i % len(items)] for i in range(size)]
+    return ('<?xml version="1.0" encoding="UTF-8"?><rss version="2.0" '
+            'xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:content="http://purl.org/rss/1.0/modules/content/">'
+            '<channel><title>Bench</title>' + ''.join(items) + '</channel></rss>').encode('utf-8')
+
+
+# ---------------------------------------------------------------------------
+# Offline stand-ins
+# ---------------------------------------------------------------------------
+
+class FixtureResponse:
+    """Enough of requests.Response for the article scraper"""
+
+    def __init__(self, content: bytes):
+        self.content = content
+        self.status_code = 200
+        self.headers = {'Content-Type': 'text/html; charset=utf-8'}
+        self.encoding = 'utf-8'
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size: int = 65536):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FixtureSession:
+    """Serves article fixtures round-robin instead of hitting the network"""
+
+    def __init__(self, pages: List[bytes]):
+        self.pages = pages
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        page = self.pages[self.calls % len(self.pages)]
+        self.calls += 1
+        return FixtureResponse(page)
+
+
+class FakeSnapshot:
+    def __init__(self, doc_id: str, data):
+        self.id = doc_id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data or {})
+
+
+class FakeCollection:
+    def __init__(self, docs: Dict[str, Dict]):
+        self.docs = docs
+
+    def document(self, doc_id):
+        return FakeDocument(self.docs, doc_id)
+
+    def where(self, *args, **kwargs):
+        return self
+
+    def select(self, fields):
+        return self
+
+    def limit(self, count):
+        return self
+
+    def stream(self):
+        return iter([FakeSnapshot(doc_id, data) for doc_id, data in self.docs.items()])
+
+    def get(self):
+        return list(self.stream())
+
+
+class FakeDocument:
+    def __init__(self, docs, doc_id):
+        self.docs = docs
+        self.id = doc_id
+
+    def get(self):
+        return FakeSnapshot(self.id, self.docs.get(self.id))
+
+
+class FakeDB:
+    """In-memory stand-in for the few Firestore calls the deduplicator makes"""
+
+    def __init__(self, docs: Dict[str, Dict]):
+        self.docs = docs
+
+    def collection(self, name):
+        return FakeCollection(self.docs)
+
+    def get_all(self, refs):
+        return [ref.get() for ref in refs]
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+
+def bench_parse_feed(fixtures, size, rng):
+    document = feed_of_size(fixtures, size)
+    return lambda: feedparser.parse(document), size
+
+
+def bench_extract_article(fixtures, size, rng):
+    scraper = BleepingComputerScraper()
+    scraper.session = FixtureSession(fixtures['articles'])
+    urls = [f"https://www.bleepingcomputer.com/news/security/bench-{i}/" for i in range(size)]
+
+    def run():
+        for url in urls:
+            scraper._scrape_full_article(url)
+    return run, size
+
+
+def _texts(rng, size):
+    return [f"{_sentence(rng, 12)} CVE-2024-{rng.randint(1000, 9999)} {_sentence(rng, 120)}" for _ in range(size)]
+
+
+def bench_enrich(fixtures, size, rng):
+    texts = _texts(rng, size)
+
+    def run():
+        for text in texts:
+            detect_industry(text)
+            extract_cve(text)
+    return run, size
+
+
+def bench_similarity(fixtures, size, rng):
+    titles = [_sentence(rng, 10) for _ in range(size)]
+    dedup = ArticleDeduplicator.__new__(ArticleDeduplicator)
+    pairs = list(zip(titles, titles[1:] + titles[:1]))
+
+    def run():
+        for first, second in pairs:
+            dedup._similarity_score(first, second)
+    return run, size
+
+
+def bench_is_duplicate(fixtures, size, rng, tmp_dir):
+    stored = {generate_article_id(f"https://example.com/{i}"): {'title': _sentence(rng, 10)}
+              for i in range(0, size * 2, 2)}
+    articles = [{'url': f"https://example.com/{i}", 'title': _sentence(rng, 10)} for i in range(size)]
+    from seen_index import SeenIndex
+    index_path = os.path.join(tmp_dir, f'seen-{size}-{time.time_ns()}.sqlite3')
+    dedup = ArticleDeduplicator(FakeDB(stored), seen_index=SeenIndex(index_path))
+    dedup.load_title_index()
+    dedup._seen_index_ready()
+
+    def run():
+        dedup.cache.clear()
+        for article in articles:
+            dedup.is_duplicate(article)
+    return run, size
+
+
+def bench_firestore_format(fixtures, size, rng):
+    articles = [{
+        'title': _sentence(rng, 10), 'url': f"https://example.com/{i}", 'summary': _sentence(rng, 60),
+        'tags': ['news', 'finance'], 'cveIds': ['CVE-2024-1234'], 'views': 0, 'trending': True,
+        'meta': {'source': 'bench', 'rank': i},
+    } for i in range(size)]
+
+    def run():
+        for article in articles:
+            convert_to_firestore_format(article)
+    return run, size
+
+
+BENCHMARKS: Dict[str, Callable] = {
+    'parse_feed': bench_parse_feed,
+    'extract_article': bench_extract_article,
+    'enrich': bench_enrich,
+    'similarity_score': bench_similarity,
+    'is_duplicate': bench_is_duplicate,
+    'firestore_format': bench_firestore_format,
+}
+
+
+def measure(fn: Callable, repeat: int) -> List[float]:
+    fn()  # Warm-up (imports, caches, lazy compilation)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def run_benchmarks(names: List[str], sizes: List[int], repeat: int) -> Dict:
+    import tempfile
+    rng = random.Random(1234)
+    fixtures = load_fixtures(rng)
+    results: Dict[str, Dict] = {}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name in names:
+            results[name] = {}
+            for size in sizes:
+                factory = BENCHMARKS[name]
+                args = (fixtures, size, random.Random(size))
+                fn, items = factory(*args, tmp_dir) if name == 'is_duplicate' else factory(*args)
+                timings = measure(fn, repeat)
+                median = statistics.median(timings)
+                results[name][str(size)] = {
+                    'median_s': round(median, 6),
+                    'min_s': round(min(timings), 6),
+                    'per_item_us': round(median / max(items, 1) * 1e6, 3),
+                }
+                print(f"  {name:<17} n={size:<6} median={median * 1000:9.2f} ms  "
+                      f"({results[name][str(size)]['per_item_us']:.1f} µs/item)")
+
+    return {
+        'meta': {
+            'createdAt': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'fixtures': fixtures['source'],
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Return human-readable regressions beyond tolerance (e.g. 0.2 = 20% slower)"""
+    regressions = []
+    print(f"\n📊 Compared with baseline from {baseline.get('meta', {}).get('createdAt', '?')}:")
+    for name, sizes in current['results'].items():
+        for size, result in sizes.items():
+            base = baseline.get('results', {}).get(name, {}).get(size)
+            if not base:
+                continue
+            ratio = result['median_s'] / max(base['median_s'], 1e-9)
+            marker = '❌' if ratio > 1 + tolerance else ('✅' if ratio < 1 - tolerance else '  ')
+            print(f"  {marker} {name:<17} n={size:<6} {ratio:6.2f}x")
+            if ratio > 1 + tolerance:
+                regressions.append(f"{name} n={size}: {ratio:.2f}x slower")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10,100,1000', help="comma-separated input sizes")
+    parser.add_argument('--only', default=','.join(BENCHMARKS), help="comma-separated benchmarks to run")
+    parser.add_argument('--repeat', type=int, default=5, help="timed repetitions per size")
+    parser.add_argument('--output', help="write results JSON here")
+    parser.add_argument('--baseline', help="compare against this results JSON")
+    parser.add_argument('--save-baseline', help="write results JSON as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed slowdown before failing")
+    args = parser.parse_args()
+
+    names = [name for name in args.only.split(',') if name]
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+
+    print("=" * 60)
+    print("  CyberTrack Scraper Benchmarks")
+    print("=" * 60)
+    results = run_benchmarks(names, sizes, args.repeat)
+    print(f"\nFixtures: {results['meta']['fixtures']}")
+
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"📁 Results saved to {path}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\n❌ Regressions: " + '; '.join(regressions))
+            sys.exit(1)
+        print("\n✅ No regressions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Record live RSS feeds and BleepingComputer article pages as benchmark fixtures.
+Run this once with network access; bench.py then runs fully offline.
+"""
+
+import argparse
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import feedparser
+from http_client import create_session
+from sources.registry import SOURCES
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+BLEEPING_FEED = "https://www.bleepingcomputer.com/feed/"
+
+
+def slug(url: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '-', url.lower().split('://', 1)[-1]).strip('-')[:80]
+
+
+def record(articles: int):
+    session = create_session()
+    feed_urls = [source.rss_url for source in SOURCES if source.enabled]
+
+    for url in feed_urls:
+        try:
+            response = session.get(url, timeout=30)
+            response.raise_for_status()
+        except Exception as e:
+            print(f"  ❌ {url}: {e}")
+            continue
+        path = os.path.join(FIXTURES_DIR, 'feeds', slug(url) + '.xml')
+        with open(path, 'wb') as f:
+            f.write(response.content)
+        print(f"  ✅ {url} -> {os.path.relpath(path)} ({len(response.content)} bytes)")
+
+        if url == BLEEPING_FEED:
+            for entry in feedparser.parse(response.content).entries[:articles]:
+                try:
+                    page = session.get(entry.link, timeout=30)
+                    page.raise_for_status()
+                except Exception as e:
+                    print(f"  ❌ {entry.link}: {e}")
+                    continue
+                path = os.path.join(FIXTURES_DIR, 'articles', slug(entry.link) + '.html')
+                with open(path, 'wb') as f:
+                    f.write(page.content)
+                print(f"  ✅ {entry.link} -> {os.path.relpath(path)}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--articles', type=int, default=10, help="BleepingComputer article pages to record")
+    record(parser.parse_args().articles)
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""Article categorization: spaCy in a process pool, batched and cached by content hash"""
+
+import hashlib
+import importlib.util
+import json
+import multiprocessing
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from matcher import KeywordMatcher
+from metrics import CATEGORY_CACHE
+
+SPACY_MODEL = os.getenv('SPACY_MODEL', 'en_core_web_sm')
+NLP_PROCESSES = int(os.getenv('NLP_PROCESSES', str(max(1, min(4, (os.cpu_count() or 2) - 1)))))
+NLP_BATCH_SIZE = int(os.getenv('NLP_BATCH_SIZE', '32'))
+NLP_MAX_WAIT = float(os.getenv('NLP_MAX_WAIT', '0.5'))
+CATEGORY_CACHE_PATH = os.getenv('CATEGORY_CACHE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.category_cache.sqlite3'))
+
+# Bump when the rules below change so cached results are recomputed
+RULES_VERSION = '1'
+
+# The label with the most keyword hits wins (title hits count double, CVE IDs
+# count for Vulnerability); ties go to the earlier label. Keywords are
+# substrings, hence the leading space in ' apt'.
+CATEGORY_KEYWORDS = {
+    'Vulnerability': ['vulnerability', 'vulnerabilities', 'flaw', 'zero-day', 'zero day', 'patch',
+                      'security update', 'remote code execution', 'privilege escalation', 'exploit'],
+    'Malware Analysis': ['malware', 'ransomware', 'trojan', 'botnet', 'backdoor', 'infostealer', 'stealer',
+                         'loader', 'spyware', 'wiper', 'worm', 'rootkit'],
+    'Incident Report': ['breach', 'incident', 'attack', 'hacked', 'leak', 'stolen', 'compromise',
+                        'outage', 'extortion', 'cyberattack'],
+    'Threat Intelligence': [' apt', 'threat actor', 'campaign', 'nation-state', 'state-sponsored',
+                            'espionage', 'threat group', 'hacking group', 'tactic', 'indicators of compromise'],
+}
+DEFAULT_CATEGORY = 'News'
+
+ATTACK_TYPE_KEYWORDS = {
+    'Ransomware': ['ransomware', 'extortion', 'encrypted files'],
+    'Phishing': ['phishing', 'smishing', 'vishing', 'credential harvesting'],
+    'DDoS': ['ddos', 'denial of service', 'denial-of-service'],
+    'Supply Chain': ['supply chain', 'supply-chain', 'dependency confusion', 'typosquat'],
+    'Zero-Day': ['zero-day', 'zero day', '0-day'],
+    'Data Breach': ['data breach', 'breach', 'leaked data', 'data leak', 'exposed records'],
+    'Malware': ['malware', 'trojan', 'infostealer', 'botnet', 'backdoor'],
+}
+
+# First level with any hit wins
+SEVERITY_KEYWORDS = {
+    'Critical': ['actively exploit', 'exploited in the wild', 'in the wild', 'zero-day', 'zero day',
+                 'remote code execution', 'wormable', 'critical vulnerability', 'critical flaw',
+                 'critical-severity', 'critical severity', 'critical bug', 'emergency patch'],
+    'High': ['ransomware', 'breach', 'exploit', 'high-severity', 'high severity', 'backdoor',
+             'privilege escalation', 'data leak'],
+    'Medium': ['vulnerability', 'vulnerabilities', 'malware', 'phishing', 'patch', 'flaw'],
+}
+DEFAULT_SEVERITY = 'Low'
+
+CATEGORY_MATCHER = KeywordMatcher(CATEGORY_KEYWORDS)
+ATTACK_MATCHER = KeywordMatcher(ATTACK_TYPE_KEYWORDS)
+SEVERITY_MATCHER = KeywordMatcher(SEVERITY_KEYWORDS)
+_CVSS = re.compile(r'cvss(?:v[23](?:\.\d)?)?[^0-9]{0,20}(\d{1,2}(?:\.\d)?)', re.I)
+
+
+def _score(matcher: KeywordMatcher, text: str, scores: Dict[str, int]) -> Dict[str, int]:
+    matches = matcher.scan(text)
+    for keyword in matches.keywords:
+        for label in matcher.labels_of(keyword):
+            scores[label] = scores.get(label, 0) + 1
+    if matches.cves:
+        scores['Vulnerability'] = scores.get('Vulnerability', 0) + 1
+    return scores
+
+
+def classify_text(title: str, body: str, lemmas: str = '', organizations: Optional[List[str]] = None) -> Dict:
+    """Rule-based classification over the raw text plus (optionally) spaCy lemmas.
+
+    Lemmas let one keyword cover its inflections ("exploited", "exploits"
+    -> "exploit"); without spaCy the raw text is matched alone.
+    """
+    text = f"{title}\n{body}\n{lemmas}"
+    scores = _score(CATEGORY_MATCHER, title, _score(CATEGORY_MATCHER, text, {}))
+    category = max(CATEGORY_KEYWORDS, key=lambda label: scores.get(label, 0))
+    if not scores.get(category):
+        category = DEFAULT_CATEGORY
+
+    severity_labels = SEVERITY_MATCHER.scan(text).labels
+    severity = severity_labels[0] if severity_labels else DEFAULT_SEVERITY
+    cvss_scores = [float(score) for score in _CVSS.findall(text) if float(score) <= 10]
+    if cvss_scores:
+        cvss = max(cvss_scores)
+        by_cvss = 'Critical' if cvss >= 9 else 'High' if cvss >= 7 else 'Medium' if cvss >= 4 else 'Low'
+        levels = ['Critical', 'High', 'Medium', 'Low']
+        severity = min(severity, by_cvss, key=levels.index)
+
+    return {
+        'primaryCategory': category,
+        'severity': severity,
+        'attackTypes': ATTACK_MATCHER.scan(text).labels,
+        'organizations': (organizations or [])[:5],
+    }
+
+
+# --- Worker process side -------------------------------------------------
+
+_nlp = None
+
+
+def _load_model(model: str):
+    """Process pool initializer: load spaCy once per worker"""
+    global _nlp
+    import spacy
+    # The dependency parser is the slowest component and is not needed here
+    _nlp = spacy.load(model, disable=['parser'])
+
+
+def _classify_batch(items: List[List[str]], batch_size: int) -> List[Dict]:
+    texts = (f"{title}\n{body}" for title, body in items)
+    results = []
+    for (title, body), doc in zip(items, _nlp.pipe(texts, batch_size=batch_size)):
+        lemmas = ' '.join(token.lemma_.lower() for token in doc if not token.is_space)
+        organizations = list(dict.fromkeys(ent.text for ent in doc.ents if ent.label_ == 'ORG'))
+        results.append(classify_text(title, body, lemmas, organizations))
+    return results
+
+
+# --- Caller side -----------------------------------------------------------
+
+def spacy_available(model: str = SPACY_MODEL) -> bool:
+    """Cheap check (no import) that spaCy and the model package are installed"""
+    return importlib.util.find_spec('spacy') is not None and importlib.util.find_spec(model) is not None
+
+
+class CategoryCache:
+    """SQLite map from content hash to classification result"""
+
+    def __init__(self, path: str = CATEGORY_CACHE_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS categories (hash TEXT PRIMARY KEY, result TEXT) WITHOUT ROWID')
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute('SELECT result FROM categories WHERE hash = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, result: Dict):
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO categories (hash, result) VALUES (?, ?)',
+                               (key, json.dumps(result)))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class Categorizer:
+    """Classifies articles, batching spaCy work across calling threads.
+
+    categorize() may be called from many pipeline threads at once. Cache
+    misses go onto a queue; a dispatcher thread groups them into batches of
+    up to batch_size (or whatever arrived within max_wait) and hands each
+    batch to a process pool whose workers each load the model once and run
+    nlp.pipe. Callers block only on their own result, so I/O stages keep
+    running while the pool is busy.
+
+    Without spaCy installed the same rules run in-process on the raw text.
+    """
+
+    def __init__(self, processes: int = NLP_PROCESSES, batch_size: int = NLP_BATCH_SIZE,
+                 max_wait: float = NLP_MAX_WAIT, model: str = SPACY_MODEL,
+                 cache: Optional[CategoryCache] = None, use_spacy: Optional[bool] = None):
+        self.processes = max(1, processes)
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait
+        self.model = model
+        self.use_spacy = spacy_available(model) if use_spacy is None else use_spacy
+        self.engine = f"spacy:{model}" if self.use_spacy else 'keywords'
+        self.cache = cache or CategoryCache()
+        self._pending: queue.Queue = queue.Queue()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._dispatcher: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+
+    def content_hash(self, title: str, body: str) -> str:
+        digest = hashlib.sha256(f"{RULES_VERSION}\0{self.engine}\0{title}\0{body}".encode('utf-8'))
+        return digest.hexdigest()
+
+    def _lookup(self, article: Dict) -> Tuple[str, str, str, Optional[Dict]]:
+        """(title, body, cache key, cached result or None) of an article"""
+        title = article.get('title', '')
+        body = f"{article.get('summary', '')}\n{article.get('fullContent', '')}"
+        key = self.content_hash(title, body)
+        result = self.cache.get(key)
+        CATEGORY_CACHE.inc(result='hit' if result else 'miss')
+        return title, body, key, result
+
+    def categorize(self, article: Dict) -> Dict:
+        """Set primaryCategory, severity, attackTypes and organizations on the article"""
+        title, body, key, result = self._lookup(article)
+        if result is None:
+            result, cacheable = self._classify(title, body)
+            if cacheable:
+                self.cache.put(key, result)
+        article.update(result)
+        return article
+
+    def categorize_many(self, articles: List[Dict]) -> List[Dict]:
+        """Categorize a whole batch: every cache miss is queued for the
+        dispatcher before waiting on any result, without a thread per article"""
+        waiting = []
+        for article in articles:
+            title, body, key, result = self._lookup(article)
+            if result is not None:
+                article.update(result)
+            else:
+                waiting.append((article, title, body, key, self._queue(title, body) if self.use_spacy else None))
+        for article, title, body, key, future in waiting:
+            result, cacheable = self._await(future, title, body)
+            if cacheable:
+                self.cache.put(key, result)
+            article.update(result)
+        return articles
+
+    def _queue(self, title: str, body: str) -> Future:
+        """Hand one text to the dispatcher, which batches it for the process pool"""
+        future: Future = Future()
+        self._ensure_started()
+        self._pending.put(([title, body], future))
+        return future
+
+    def _await(self, future: Optional[Future], title: str, body: str):
+        """Returns (result, cacheable); keyword fallbacks for a spaCy run are not cached"""
+        if future is not None:
+            try:
+                return future.result(), True
+            except Exception as e:
+                if self.use_spacy:
+                    print(f"⚠️ spaCy categorization failed ({e}); using keyword rules")
+                self.use_spacy = False
+        return classify_text(title, body), self.engine == 'keywords'
+
+    def _classify(self, title: str, body: str):
+        return self._await(self._queue(title, body) if self.use_spacy else None, title, body)
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a process that already runs I/O threads is unsafe
+                self._pool = ProcessPoolExecutor(max_workers=self.processes,
+                                                 mp_context=multiprocessing.get_context('spawn'),
+                                                 initializer=_load_model, initargs=(self.model,))
+                self._dispatcher = threading.Thread(target=self._dispatch, name='categorize-dispatch', daemon=True)
+                self._dispatcher.start()
+
+    def _dispatch(self):
+        while not self._closed.is_set():
+            try:
+                batch = [self._pending.get(timeout=0.2)]
+            except queue.Empty:
+                continue
+            deadline = time.time() + self.max_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._submit(batch)
+
+    def _submit(self, batch):
+        items = [item for item, _ in batch]
+        futures = [future for _, future in batch]
+        try:
+            work = self._pool.submit(_classify_batch, items, self.batch_size)
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+
+        def deliver(done):
+            try:
+                results = done.result()
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                return
+            for future, result in zip(futures, results):
+                future.set_result(result)
+
+        work.add_done_callback(deliver)
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True, cancel_futures=True)
+                self._pool = None
+        self.cache.close()
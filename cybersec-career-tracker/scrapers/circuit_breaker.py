@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Per-source circuit breaker that persists across runs"""
+
+import os
+import time
+from typing import Optional
+
+from feed_cache import FeedStateStore, default_store
+
+# Consecutive failures before a source is paused
+BREAKER_FAILURES = int(os.getenv('BREAKER_FAILURES', '3'))
+# First pause length; every further failure doubles it up to the maximum
+BREAKER_COOLDOWN = float(os.getenv('BREAKER_COOLDOWN', '1800'))
+BREAKER_MAX_COOLDOWN = float(os.getenv('BREAKER_MAX_COOLDOWN', str(7 * 24 * 3600)))
+
+
+class CircuitBreaker:
+    """Stops calling a source after repeated failures.
+
+    Closed: calls go through and failures are counted. After `threshold`
+    consecutive failures the breaker opens and allow() returns False until
+    the cooldown passes. The next call is a trial: success closes the
+    breaker, failure reopens it for twice as long. State lives in the feed
+    state file, so a dead feed stays paused between cron runs too.
+    """
+
+    def __init__(self, key: str, store: Optional[FeedStateStore] = None,
+                 threshold: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN,
+                 max_cooldown: float = BREAKER_MAX_COOLDOWN):
+        self.key = key
+        self._store = store
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+
+    @property
+    def store(self) -> FeedStateStore:
+        return self._store or default_store()
+
+    @property
+    def failures(self) -> int:
+        return self.store.get(self.key).get('failures', 0)
+
+    @property
+    def open_until(self) -> float:
+        return self.store.get(self.key).get('open_until', 0)
+
+    def allow(self) -> bool:
+        """True unless the breaker is open and still cooling down"""
+        return time.time() >= self.open_until
+
+    def record_success(self):
+        if self.failures or self.open_until:
+            self.store.update_health(self.key, 0)
+
+    def record_failure(self):
+        failures = self.failures + 1
+        open_until = 0
+        if failures >= self.threshold:
+            cooldown = min(self.cooldown * (2 ** (failures - self.threshold)), self.max_cooldown)
+            open_until = time.time() + cooldown
+        self.store.update_health(self.key, failures, open_until)
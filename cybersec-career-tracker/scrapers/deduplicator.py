@@ -2,17 +2,141 @@
 """Article deduplication system"""
 
 import hashlib
-from typing import Dict
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Set
 from datetime import datetime, timedelta
+from title_index import TitleIndex
+from seen_index import SeenIndex
+from metrics import DUPLICATES_DROPPED, firestore_rpc
+
+def generate_article_id(url: str) -> str:
+    """Generate unique ID from URL (also used as the Firestore document ID)"""
+    return hashlib.md5(url.encode()).hexdigest()
+
+class BoundedCache(OrderedDict):
+    """Dict that evicts its least recently written keys beyond maxsize.
+    
+    Pipeline stages share one cache across threads, so writes, lookups and
+    clear() hold a lock (the move/insert/evict sequence is not atomic).
+    """
+    
+    def __init__(self, maxsize: int = 10000):
+        super().__init__()
+        self.maxsize = maxsize
+        self._lock = threading.RLock()
+    
+    def __setitem__(self, key, value):
+        with self._lock:
+            if OrderedDict.__contains__(self, key):
+                self.move_to_end(key)
+            super().__setitem__(key, value)
+            while len(self) > self.maxsize:
+                self.popitem(last=False)
+    
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return super().__contains__(key)
+    
+    def clear(self):
+        with self._lock:
+            super().clear()
 
 class ArticleDeduplicator:
-    def __init__(self, db):
+    def __init__(self, db, window_days: int = 7, seen_index: SeenIndex = None, cache_size: int = 10000):
         self.db = db
-        self.cache = {}  # In-memory cache for current session
+        self.cache = BoundedCache(cache_size)  # Hot IDs in front of the seen index
+        self.window_days = window_days
+        self.title_index = None  # Loaded from Firestore on first use
+        self.seen_index = seen_index or SeenIndex()
+        self._warm_checked = False
     
     def generate_article_id(self, url: str) -> str:
         """Generate unique ID from URL"""
-        return hashlib.md5(url.encode()).hexdigest()
+        return generate_article_id(url)
+    
+    def _seen_index_ready(self) -> bool:
+        """Warm the local seen index from Firestore the first time it is needed"""
+        if self.db is None:
+            return True  # Local-only mode: the seen index is the whole truth
+        if not self._warm_checked:
+            self._warm_checked = True
+            try:
+                added = self.seen_index.warm(self.db)
+                if added:
+                    print(f"Warmed seen-article index with {added} IDs from Firestore")
+            except Exception as e:
+                print(f"Error warming seen-article index: {e}")
+        return self.seen_index.is_warm()
+    
+    def mark_seen(self, article_ids: Iterable[str]):
+        """Record freshly written article IDs locally (call after every write)"""
+        article_ids = list(article_ids)
+        for article_id in article_ids:
+            self.cache[article_id] = True
+        self.seen_index.add_many(article_ids)
+    
+    def existing_ids(self, article_ids: Iterable[str]) -> Set[str]:
+        """Return the subset of article IDs already stored.
+        
+        Uses the local seen index once it is warm; until then falls back to
+        one bulk Firestore read.
+        """
+        article_ids = list(dict.fromkeys(article_ids))
+        known = {article_id for article_id in article_ids if article_id in self.cache}
+        missing = [article_id for article_id in article_ids if article_id not in known]
+        
+        if missing and self._seen_index_ready():
+            found = self.seen_index.contains_many(missing)
+            for article_id in found:
+                self.cache[article_id] = True
+            known |= found
+        elif missing:
+            collection = self.db.collection('newsArticles')
+            refs = [collection.document(article_id) for article_id in missing]
+            with firestore_rpc('get_all'):
+                docs = list(self.db.get_all(refs))
+            for doc in docs:
+                if doc.exists:
+                    self.cache[doc.id] = True
+                    known.add(doc.id)
+        
+        return known
+    
+    def unseen_urls(self, urls: List[str]) -> List[str]:
+        """Filter article URLs down to the ones not stored yet, keeping order"""
+        ids = {url: self.generate_article_id(url) for url in urls}
+        known = self.existing_ids(ids.values())
+        unseen = [url for url in urls if ids[url] not in known]
+        DUPLICATES_DROPPED.inc(len(urls) - len(unseen), kind='exact')
+        return unseen
+    
+    def deduplicate(self, articles: List[Dict]) -> List[Dict]:
+        """Drop articles repeated within the batch or already in the database"""
+        unique = {}
+        for article in articles:
+            unique.setdefault(self.generate_article_id(article['url']), article)
+        
+        known = self.existing_ids(unique.keys())
+        accepted = []
+        for article_id, article in unique.items():
+            if article_id in known or self._has_similar_title(article['title']):
+                continue
+            self.remember_title(article_id, article['title'])
+            accepted.append(article)
+        return accepted
+    
+    def accept(self, article: Dict) -> bool:
+        """Streaming check: True (and remembered) if the article is new"""
+        article_id = self.generate_article_id(article['url'])
+        if article_id in self.load_title_index() or self.existing_ids([article_id]):
+            DUPLICATES_DROPPED.inc(kind='exact')
+            return False
+        if self._has_similar_title(article['title']):
+            DUPLICATES_DROPPED.inc(kind='fuzzy')
+            return False
+        self.remember_title(article_id, article['title'])
+        return True
     
     def is_duplicate(self, article: Dict) -> bool:
         """Check if article already exists in database"""
@@ -22,12 +146,8 @@ class ArticleDeduplicator:
         if article_id in self.cache:
             return True
         
-        # Check Firestore
-        doc_ref = self.db.collection('newsArticles').document(article_id)
-        doc = doc_ref.get()
-        
-        if doc.exists:
-            self.cache[article_id] = True
+        # Check the local seen index (or Firestore until it is warm)
+        if self.existing_ids([article_id]):
             return True
         
         # Check for similar titles (fuzzy matching)
@@ -36,24 +156,55 @@ class ArticleDeduplicator:
         
         return False
     
-    def _has_similar_title(self, title: str) -> bool:
-        """Check for articles with very similar titles"""
-        # Query recent articles (last 7 days)
-        cutoff_date = datetime.now() - timedelta(days=7)
+    def load_title_index(self) -> TitleIndex:
+        """Build the near-duplicate index from the last window_days of titles (once per run)"""
+        if self.title_index is not None:
+            return self.title_index
         
-        articles_ref = self.db.collection('newsArticles')
-        query = articles_ref.where('scrapedDate', '>=', cutoff_date).limit(100)
+        self.title_index = TitleIndex()
+        if self.db is None:
+            return self.title_index
+        cutoff_date = datetime.now() - timedelta(days=self.window_days)
+        query = (self.db.collection('newsArticles')
+                 .where('scrapedAt', '>=', cutoff_date)
+                 .select(['title', 'scrapedAt']))
         
         try:
-            docs = query.get()
-            for doc in docs:
-                existing_title = doc.to_dict().get('title', '')
-                if self._similarity_score(title, existing_title) > 0.85:
-                    return True
+            with firestore_rpc('stream_titles'):
+                loaded = self.title_index.load(
+                    (doc.id, doc.to_dict().get('title', ''), self._timestamp(doc.to_dict().get('scrapedAt')))
+                    for doc in query.stream()
+                )
+            print(f"Loaded {loaded} recent titles into the similarity index")
         except Exception as e:
-            print(f"Error checking similar titles: {e}")
+            print(f"Error loading recent titles: {e}")
         
-        return False
+        return self.title_index
+    
+    @staticmethod
+    def _timestamp(value):
+        return value.timestamp() if isinstance(value, datetime) else None
+    
+    def prune(self):
+        """Forget titles that fell out of the window (keeps long-running memory flat)"""
+        if self.title_index is None:
+            return 0
+        cutoff = datetime.now() - timedelta(days=self.window_days)
+        return self.title_index.prune(cutoff.timestamp())
+    
+    def remember_title(self, article_id: str, title: str):
+        """Add an accepted article so later candidates are checked against it"""
+        self.load_title_index().add(article_id, title)
+    
+    def forget(self, articles: Iterable[Dict]):
+        """Drop titles of accepted articles whose write failed, so a retry is not a duplicate"""
+        index = self.load_title_index()
+        for article in articles:
+            index.remove(self.generate_article_id(article['url']))
+    
+    def _has_similar_title(self, title: str) -> bool:
+        """Check for articles with very similar titles"""
+        return self.load_title_index().find_similar(title) is not None
     
     def _similarity_score(self, str1: str, str2: str) -> float:
         """Calculate similarity between two strings (simple Jaccard similarity)"""
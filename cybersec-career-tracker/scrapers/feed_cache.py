@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""Persistent per-feed state for conditional GETs (ETag / Last-Modified)"""
+
+import copy
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, Optional
+
+FEED_STATE_PATH = os.getenv('FEED_STATE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.feed_state.json'))
+
+
+def state_key(url: str, consumer: Optional[str] = None) -> str:
+    """Store key of a feed as read by one entry point.
+
+    rss_scraper.py, fetch_real_news.py and main.py read some of the same
+    feeds; each needs its own validators, or whichever runs second would
+    get a 304 and miss the new items.
+    """
+    return f"{consumer}:{url}" if consumer else url
+
+
+def body_hash(content: bytes) -> str:
+    """Stable fingerprint of a feed body"""
+    return hashlib.sha256(content).hexdigest()
+
+
+class FeedStateStore:
+    """On-disk store of each feed's HTTP validators and last body hash.
+
+    Entries are keyed by state_key(url, consumer).
+
+    State is kept in memory while a run is in progress and written back
+    atomically by save(), so a crash mid-run never leaves a torn file.
+    """
+
+    def __init__(self, path: str = FEED_STATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._state: Dict[str, Dict] = {}
+        self._saved: Dict[str, Dict] = {}  # State as last written to disk
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._state = json.load(f)
+        except FileNotFoundError:
+            self._state = {}
+        except (OSError, ValueError) as e:
+            print(f"  ⚠️ Ignoring unreadable feed state {self.path}: {e}")
+            self._state = {}
+        self._saved = copy.deepcopy(self._state)
+
+    def get(self, url: str) -> Dict:
+        """Return a copy of the saved state for a feed (empty if unknown)"""
+        with self._lock:
+            return dict(self._state.get(url, {}))
+
+    def request_headers(self, url: str) -> Dict[str, str]:
+        """Conditional GET headers for a feed"""
+        state = self.get(url)
+        headers = {}
+        if state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+        if state.get('modified'):
+            headers['If-Modified-Since'] = state['modified']
+        return headers
+
+    def is_unchanged(self, url: str, digest: str) -> bool:
+        """True if the body hash matches the last one seen for this feed"""
+        return self.get(url).get('hash') == digest
+
+    def update(self, url: str, etag: Optional[str] = None,
+               modified: Optional[str] = None, digest: Optional[str] = None):
+        """Record fresh validators for a feed"""
+        with self._lock:
+            state = self._state.setdefault(url, {})
+            if etag:
+                state['etag'] = etag
+            if modified:
+                state['modified'] = modified
+            if digest:
+                state['hash'] = digest
+            self._dirty = True
+
+    def discard(self, url: str):
+        """Roll a feed's validators back to the last saved ones.
+
+        Used when the articles fetched with them were never stored, so the
+        next run downloads and parses the feed again instead of getting a 304.
+        """
+        with self._lock:
+            state = self._state.get(url)
+            if state is None:
+                return
+            saved = self._saved.get(url, {})
+            for field in ('etag', 'modified', 'hash'):
+                if field in saved:
+                    state[field] = saved[field]
+                else:
+                    state.pop(field, None)
+            self._dirty = True
+
+    def update_health(self, url: str, failures: int, open_until: float = 0):
+        """Record a feed's consecutive failures and circuit-breaker deadline"""
+        with self._lock:
+            state = self._state.setdefault(url, {})
+            state['failures'] = failures
+            if open_until:
+                state['open_until'] = open_until
+            else:
+                state.pop('open_until', None)
+            self._dirty = True
+
+    def save(self):
+        """Atomically persist the state file if anything changed"""
+        with self._lock:
+            if not self._dirty:
+                return
+            directory = os.path.dirname(self.path) or '.'
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.feed_state.', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(self._state, f, separators=(',', ':'))
+                os.replace(tmp_path, self.path)
+            except Exception:
+                os.unlink(tmp_path)
+                raise
+            self._saved = copy.deepcopy(self._state)
+            self._dirty = False
+
+
+_default_store: Optional[FeedStateStore] = None
+_default_lock = threading.Lock()
+
+
+def default_store() -> FeedStateStore:
+    """Process-wide feed state store shared by all scrapers"""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = FeedStateStore()
+        return _default_store
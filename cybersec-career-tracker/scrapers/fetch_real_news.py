@@ -1,80 +1,87 @@
 #!/usr/bin/env python3
-import feedparser
-import json
+import os
 import time
-from datetime import datetime
+from fetcher import FetchEngine
+from http_client import reset_retry_budget
+from feed_cache import default_store
+from matcher import KeywordMatcher
+from news_export import NewsExporter
+from sources.registry import sources_for
+from timeline import entry_timestamp, merge_newest, to_iso
 
-# List of RSS feeds focused on cybersecurity incidents
-rss_feeds = [
-    "https://feeds.feedburner.com/TheHackersNews",
-    "https://www.darkreading.com/rss.xml",
-    "https://krebsonsecurity.com/feed/",
-    "https://gbhackers.com/feed/",
-    "https://www.csoonline.com/feed/",
-    "https://threatpost.com/feed/",
-    "https://www.cisa.gov/uscert/ncas/alerts.xml",
-    "https://www.bankinfosecurity.com/rss-feeds",
-    "https://www.cyberdefensemagazine.com/feed/",
-    "https://www.itsecurityguru.org/feed/",
-    "https://searchsecurity.techtarget.com/rss/Security-Wire-Daily-News.xml",
-    "https://hackread.com/feed/",
-    "https://grahamcluley.com/feed/",
-    "https://thecyberpost.com/feed/",
-    "https://www.cshub.com/rss"
-]
+# RSS feeds focused on cybersecurity incidents (see sources/registry.py)
+news_sources = sources_for('static')
 
 # Keywords to filter for incidents/reports
 incident_keywords = ["incident", "breach", "attack", "vulnerability", "exploit", "ransomware", "malware", "cyberattack", "data leak"]
+incident_matcher = KeywordMatcher({"incident": incident_keywords})
 
-def fetch_news():
-    all_news = []
+# How many of the newest relevant items each run exports
+TOP_K = int(os.getenv('NEWS_TOP_K', '200'))
+
+def feed_items(source, feed, fetched_at: float):
+    """Relevant items of one feed, newest first.
+
+    Entries are ordered by their normalized timestamp up front; the keyword
+    filter runs lazily, so entries past the merge cut-off are never scanned.
+    Entries without any date are treated as published at fetch time.
+    """
+    dated = [(entry_timestamp(entry), entry) for entry in feed.entries]
+    undated = sum(1 for timestamp, _ in dated if timestamp is None)
+    if undated:
+        print(f"  ⚠️ {undated} undated entries in {source.rss_url}, using fetch time")
+    dated = sorted(((timestamp if timestamp is not None else fetched_at, entry) for timestamp, entry in dated),
+                   key=lambda pair: pair[0], reverse=True)
+
+    for timestamp, entry in dated:
+        title = entry.get("title", "No Title")
+        summary = entry.get("summary", "No Summary")
+        link = entry.get("link", "No Link")
+
+        # Filter for relevant content
+        if incident_matcher.scan(f"{title}\n{summary}").keywords:
+            yield {
+                "title": title,
+                "summary": summary,
+                "link": link,
+                "published": to_iso(timestamp),
+                "publishedTs": int(timestamp),
+                "source": feed.feed.get("title", source.rss_url)
+            }
+
+def fetch_news(limit: int = TOP_K):
     print("=" * 60)
     print("  Fetching Real Cybersecurity News")
     print("=" * 60)
     
-    for feed_url in rss_feeds:
-        try:
-            print(f"\n📡 Fetching: {feed_url}")
-            feed = feedparser.parse(feed_url)
-            count = 0
-            
-            for entry in feed.entries:
-                title = entry.get("title", "No Title")
-                summary = entry.get("summary", "No Summary")
-                link = entry.get("link", "No Link")
-                pub_date = entry.get("published", datetime.now().isoformat())
-                
-                # Filter for relevant content
-                if any(keyword.lower() in title.lower() or keyword.lower() in summary.lower() for keyword in incident_keywords):
-                    all_news.append({
-                        "title": title,
-                        "summary": summary,
-                        "link": link,
-                        "published": pub_date,
-                        "source": feed.feed.get("title", feed_url)
-                    })
-                    count += 1
-            
-            print(f"  ✅ Found {count} relevant articles")
-            time.sleep(2)  # Delay to avoid rate limiting
-            
-        except Exception as e:
-            print(f"  ❌ Error: {e}")
+    print(f"\n📡 Fetching {len(news_sources)} feeds concurrently...")
+    fetched_at = time.time()
+    reset_retry_budget()
+    feeds = FetchEngine().map(lambda source: source.fetch(), news_sources, url_of=lambda source: source.rss_url)
+
+    streams = []
+    for source, feed in zip(news_sources, feeds):
+        if feed is None:
+            print(f"\n⏭️ Unchanged or unreachable: {source.rss_url}")
+            continue
+        print(f"\n📡 Fetched: {source.rss_url} ({len(feed.entries)} entries)")
+        streams.append(feed_items(source, feed, fetched_at))
     
-    # Sort by date (newest first)
-    all_news.sort(key=lambda x: x["published"], reverse=True)
+    # Newest `limit` items across all feeds, without sorting everything
+    all_news = merge_newest(streams, key=lambda item: item["publishedTs"], limit=limit)
+    print(f"\n✅ Kept the {len(all_news)} newest relevant articles")
     
-    # Save to JSON for React app
-    output_file = "../public/cyber_news.json"
-    with open(output_file, "w", encoding='utf-8') as f:
-        json.dump(all_news, f, indent=4, ensure_ascii=False)
+    # Merge into the paginated output (only the newest page and manifest are rewritten)
+    exporter = NewsExporter()
+    added = exporter.merge(all_news)
+    default_store().save()
     
     print("\n" + "=" * 60)
-    print(f"✅ Fetched {len(all_news)} news items!")
-    print(f"📁 Saved to: {output_file}")
+    print(f"✅ Fetched {len(all_news)} news items, {added} new!")
+    print(f"📁 Saved to: {exporter.out_dir}")
     print("=" * 60)
     
-    return all_news
+    return exporter.newest(len(all_news) or 5)
 
 # Run the function
 if __name__ == "__main__":
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Bulk Firestore writes with deterministic document IDs"""
+
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from deduplicator import generate_article_id
+from metrics import firestore_rpc
+
+logger = logging.getLogger(__name__)
+
+# Firestore caps a single WriteBatch at 500 operations
+MAX_BATCH_SIZE = 500
+
+
+def _chunks(items: List, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def bulk_save(db, articles: List[Dict], collection: str = 'newsArticles',
+              batch_size: int = MAX_BATCH_SIZE,
+              prepare: Optional[Callable[[Dict], None]] = None) -> Tuple[List[str], int]:
+    """Write articles that are not stored yet, in chunked WriteBatch commits.
+
+    Each chunk costs two RPCs: one get_all to find which document IDs already
+    exist and one batch commit for the rest. Document IDs are derived from the
+    article URL, so overlapping runs overwrite the same document instead of
+    creating a second copy.
+
+    prepare, if given, is called on each new article just before it is
+    queued (e.g. to stamp scrapedAt). Returns (saved document IDs, skipped).
+    """
+    batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+    collection_ref = db.collection(collection)
+
+    # Collapse repeats within the input so a batch never writes one doc twice
+    by_id: Dict[str, Dict] = {}
+    for article in articles:
+        by_id.setdefault(generate_article_id(article['url']), article)
+    skipped = len(articles) - len(by_id)
+
+    saved_ids: List[str] = []
+    chunks = list(_chunks(list(by_id.items()), batch_size))
+    for number, chunk in enumerate(chunks, 1):
+        started = time.time()
+        refs = {article_id: collection_ref.document(article_id) for article_id, _ in chunk}
+        with firestore_rpc('get_all'):
+            existing = {doc.id for doc in db.get_all(list(refs.values())) if doc.exists}
+        lookup_time = time.time() - started
+
+        batch = db.batch()
+        written = []
+        for article_id, article in chunk:
+            if article_id in existing:
+                continue
+            if prepare is not None:
+                prepare(article)
+            batch.set(refs[article_id], article)
+            written.append(article_id)
+
+        if written:
+            with firestore_rpc('commit'):
+                batch.commit()
+        saved_ids.extend(written)
+        skipped += len(existing)
+
+        logger.info(
+            f"Batch {number}/{len(chunks)}: wrote {len(written)}, skipped {len(existing)} "
+            f"(lookup {lookup_time:.2f}s, total {time.time() - started:.2f}s)"
+        )
+
+    return saved_ids, skipped
+
+
+def bulk_update(db, updates: Dict[str, Dict], collection: str = 'newsArticles',
+                batch_size: int = MAX_BATCH_SIZE) -> List[str]:
+    """Apply field updates to existing documents, one WriteBatch per chunk.
+
+    update() fails the whole commit if a document is missing, so callers
+    should only pass IDs known to be stored. Returns the IDs updated.
+    """
+    batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+    collection_ref = db.collection(collection)
+    updated: List[str] = []
+    for chunk in _chunks(list(updates.items()), batch_size):
+        batch = db.batch()
+        for article_id, fields in chunk:
+            batch.update(collection_ref.document(article_id), fields)
+        with firestore_rpc('commit'):
+            batch.commit()
+        updated.extend(article_id for article_id, _ in chunk)
+    return updated
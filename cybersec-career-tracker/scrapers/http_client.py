@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""Shared HTTP sessions with keep-alive connection pooling"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Deque, Dict, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+from metrics import HTTP_HEDGES, HTTP_RETRIES, RETRY_BUDGET_EXHAUSTED
+
+if TYPE_CHECKING:
+    import requests
+
+USER_AGENT = os.getenv('USER_AGENT', 'Mozilla/5.0 (compatible; CyberTrackScraper/1.0)')
+REQUEST_TIMEOUT = float(os.getenv('REQUEST_TIMEOUT', '30'))
+POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '16'))
+
+# A host that cannot even accept a connection in this long is not worth waiting on
+CONNECT_TIMEOUT = float(os.getenv('CONNECT_TIMEOUT', '5'))
+HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', '2'))
+HTTP_BACKOFF = float(os.getenv('HTTP_BACKOFF', '0.5'))
+HTTP_MAX_BACKOFF = float(os.getenv('HTTP_MAX_BACKOFF', '8'))
+# Retries plus hedges allowed per run, so a broken CDN cannot multiply the load
+HTTP_RETRY_BUDGET = int(os.getenv('HTTP_RETRY_BUDGET', '50'))
+# Hedge only hosts with enough samples, and never sooner than HEDGE_MIN_DELAY
+HEDGE_MIN_SAMPLES = int(os.getenv('HEDGE_MIN_SAMPLES', '10'))
+HEDGE_MIN_DELAY = float(os.getenv('HEDGE_MIN_DELAY', '0.25'))
+
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Safe to send twice; other methods are only retried when the caller asks for it
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD'})
+
+_sessions: Dict[int, 'requests.Session'] = {}
+_lock = threading.Lock()
+
+
+def create_session(pool_size: int = POOL_SIZE) -> 'requests.Session':
+    """Build a session whose connection pool can serve pool_size threads"""
+    # Imported here so modules that only might make requests load quickly
+    import requests
+    from requests.adapters import HTTPAdapter
+    
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+
+def get_session(pool_size: int = POOL_SIZE) -> 'requests.Session':
+    """Process-wide pooled session so repeated requests reuse TCP/TLS connections"""
+    with _lock:
+        session = _sessions.get(pool_size)
+        if session is None:
+            session = create_session(pool_size)
+            _sessions[pool_size] = session
+        return session
+
+
+class LatencyTracker:
+    """Recent response latencies per host, for the hedging threshold"""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, host: str, seconds: float):
+        with self._lock:
+            samples = self._samples.get(host)
+            if samples is None:
+                samples = self._samples[host] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def p95(self, host: str, min_samples: int = HEDGE_MIN_SAMPLES) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(host, ()))
+        if len(samples) < max(1, min_samples):
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+
+class RetryBudget:
+    """Caps retries and hedged requests per run (reset() at the start of each run)"""
+
+    def __init__(self, limit: int = HTTP_RETRY_BUDGET):
+        self.limit = limit
+        self.spent = 0
+        self._lock = threading.Lock()
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self.spent >= self.limit:
+                RETRY_BUDGET_EXHAUSTED.inc()
+                return False
+            self.spent += 1
+            return True
+
+    def reset(self):
+        with self._lock:
+            self.spent = 0
+
+
+LATENCY = LatencyTracker()
+RETRY_BUDGET = RetryBudget()
+_hedge_pool: Optional[ThreadPoolExecutor] = None
+
+
+def reset_retry_budget():
+    RETRY_BUDGET.reset()
+
+
+def _timeouts(timeout: Union[float, Tuple[float, float], None]) -> Tuple[float, float]:
+    """(connect, read) timeouts; a single number is the read timeout"""
+    if isinstance(timeout, tuple):
+        return timeout
+    read = REQUEST_TIMEOUT if timeout is None else timeout
+    return min(CONNECT_TIMEOUT, read), read
+
+
+def _backoff(attempt: int, retry_after: Optional[str] = None) -> float:
+    delay = min(HTTP_MAX_BACKOFF, HTTP_BACKOFF * (2 ** attempt))
+    if retry_after and retry_after.isdigit():
+        return min(HTTP_MAX_BACKOFF, float(retry_after))
+    return delay * (0.5 + random.random() / 2)
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _hedge_pool
+    with _lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=POOL_SIZE * 2, thread_name_prefix='hedge')
+        return _hedge_pool
+
+
+def _close_quietly(future):
+    try:
+        future.result().close()
+    except Exception:
+        pass
+
+
+def _send_hedged(send, host: str, hedge_after: float):
+    """Run send(); if it is still pending after hedge_after seconds, race a second copy"""
+    pool = _pool()
+    futures = [pool.submit(send)]
+    done, _ = wait(futures, timeout=hedge_after)
+    if not done and RETRY_BUDGET.try_spend():
+        futures.append(pool.submit(send))
+
+    pending = set(futures)
+    error: Optional[BaseException] = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is not None:
+                error = future.exception()
+                continue
+            if len(futures) > 1:
+                HTTP_HEDGES.inc(host=host, result='hedge' if future is futures[1] else 'primary')
+            for loser in pending:
+                loser.add_done_callback(_close_quietly)  # Free its connection once it finishes
+            for extra in done - {future}:
+                _close_quietly(extra)
+            return future.result()
+    raise error
+
+
+def request(method: str, url: str, session: Optional['requests.Session'] = None,
+            timeout: Union[float, Tuple[float, float], None] = None,
+            retries: Optional[int] = None, hedge: bool = True, **kwargs) -> 'requests.Response':
+    """Send a request with connect/read timeouts, capped exponential backoff
+    and, for GET/HEAD to hosts with known latency, a hedged second request.
+
+    Connection errors, timeouts, 429 and 5xx are retried while the per-run
+    retry budget lasts; other responses are returned as they are, so the
+    caller still decides what a 404 means. Only GET and HEAD retry by
+    default: a POST that timed out may still have been applied, so other
+    methods retry only when the caller passes retries, and never hedge.
+    """
+    import requests
+
+    method = method.upper()
+    idempotent = method in IDEMPOTENT_METHODS
+    if retries is None:
+        retries = HTTP_MAX_RETRIES if idempotent else 0
+    session = session or get_session()
+    host = urlparse(url).netloc.lower()
+    send_method = getattr(session, method.lower())
+    kwargs['timeout'] = _timeouts(timeout)
+
+    def send():
+        started = time.time()
+        response = send_method(url, **kwargs)
+        LATENCY.record(host, time.time() - started)
+        return response
+
+    hedge_after = LATENCY.p95(host) if hedge and idempotent else None
+    attempt = 0
+    while True:
+        try:
+            if hedge_after is not None:
+                response = _send_hedged(send, host, max(hedge_after, HEDGE_MIN_DELAY))
+            else:
+                response = send()
+            status = getattr(response, 'status_code', 200)
+            if status not in _RETRY_STATUSES or attempt >= retries:
+                return response
+            delay = _backoff(attempt, response.headers.get('Retry-After'))
+            reason = f"HTTP {status}"
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt >= retries:
+                raise
+            response, delay, reason = None, _backoff(attempt), type(e).__name__
+
+        if not RETRY_BUDGET.try_spend():
+            if response is not None:
+                return response
+            raise requests.ConnectionError(f"{url}: retry budget exhausted after {reason}")
+        if response is not None:
+            response.close()
+        HTTP_RETRIES.inc(host=host, reason=reason)
+        time.sleep(delay)
+        attempt += 1
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Local JSON Lines article sink for dry runs and offline scraping"""
+
+import json
+import os
+import threading
+from datetime import date, datetime
+from typing import Dict, List, Tuple
+
+from deduplicator import generate_article_id
+from storage import StorageSink
+
+JSONL_PATH = os.getenv('JSONL_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'articles.jsonl'))
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+class JsonlSink(StorageSink):
+    """Appends one JSON object per article to a local file.
+
+    Needs no credentials or network, so `main.py --sink=jsonl` can run the
+    whole pipeline without Firebase. It keeps its own seen index next to the
+    output file: articles written here must not count as stored in Firestore.
+    """
+
+    name = 'jsonl'
+
+    def __init__(self, path: str = JSONL_PATH):
+        self.path = path
+        base = os.path.splitext(path)[0]
+        self.seen_index_path = base + '.seen.sqlite3'
+        self.trending_state_path = base + '.trending.sqlite3'
+        self.updates_path = base + '.updates.jsonl'
+        self._lock = threading.Lock()
+
+    @property
+    def write_log_path(self) -> str:
+        return os.path.splitext(self.path)[0] + '.pending.sqlite3'
+
+    def write(self, articles: List[Dict]) -> Tuple[List[str], int]:
+        """Append articles (one line each); returns (written IDs, skipped repeats)"""
+        by_id: Dict[str, Dict] = {}
+        for article in articles:
+            by_id.setdefault(generate_article_id(article['url']), article)
+
+        now = datetime.now().isoformat()
+        lines = []
+        for article_id, article in by_id.items():
+            record = dict(article, id=article_id, scrapedAt=now, views=0)
+            record.setdefault('trending', False)
+            lines.append(json.dumps(record, default=_json_default, ensure_ascii=False))
+
+        self._append(self.path, lines)
+        return list(by_id), len(articles) - len(by_id)
+
+    def update(self, updates: Dict[str, Dict]) -> List[str]:
+        """Append field updates (e.g. trending scores) to the updates file"""
+        now = datetime.now().isoformat()
+        self._append(self.updates_path, [json.dumps(dict(fields, id=article_id, updatedAt=now))
+                                         for article_id, fields in updates.items()])
+        return list(updates)
+
+    def _append(self, path: str, lines: List[str]):
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        with self._lock, open(path, 'a', encoding='utf-8') as f:
+            f.write(''.join(line + '\n' for line in lines))
@@ -6,14 +6,30 @@ Aggregates cybersecurity news from multiple sources and stores in Firebase
 
 import os
 import sys
+import signal
+import threading
+import socket
+import argparse
 import time
 import logging
 from datetime import datetime
-from typing import List, Dict
-import firebase_admin
-from firebase_admin import credentials, firestore
-from sources.bleeping_computer import BleepingComputerScraper
-from deduplicator import Deduplicator
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional
+from categorizer import Categorizer
+from trending import TrendTracker
+from storage import STORAGE_SINKS, WRITE_BEHIND, WRITE_BEHIND_FLUSH_TIMEOUT, WriteBehindLog, open_sink
+from deduplicator import ArticleDeduplicator
+from feed_cache import default_store, state_key
+from seen_index import SeenIndex
+from scheduler import AdaptiveScheduler, PollState
+from pipeline import Pipeline, Stage, BatchSink
+from http_client import reset_retry_budget
+from metrics import REGISTRY, ENTRIES_PARSED, ARTICLES_WRITTEN, TRENDING_UPDATES, write_metrics
+
+# firebase_admin, feedparser, lxml and the source modules are imported on
+# first use, so `--help`, `--sink=jsonl` and cron start-up stay fast.
+
+SINKS = STORAGE_SINKS
 
 # Configure logging
 logging.basicConfig(
@@ -26,19 +42,48 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Worker threads per pipeline stage
+STAGE_WORKERS = {
+    'fetch': int(os.getenv('FETCH_WORKERS', '4')),
+    'parse': int(os.getenv('PARSE_WORKERS', '2')),
+    'enrich': int(os.getenv('ENRICH_WORKERS', '6')),
+    'dedupe': 1,  # The title index is not thread-safe
+    # Mostly waiting on the NLP process pool; enough threads to fill its batches
+    'categorize': int(os.getenv('CATEGORIZE_WORKERS', '16')),
+}
+WRITE_BATCH_SIZE = int(os.getenv('WRITE_BATCH_SIZE', '50'))
+QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '100'))
+
 class NewsScraperOrchestrator:
     """Main orchestrator for news scraping"""
     
-    def __init__(self):
+    def __init__(self, sink: str = 'firestore', jsonl_path: Optional[str] = None,
+                 sqlite_path: Optional[str] = None, write_behind: bool = WRITE_BEHIND):
         self.db = None
-        self.deduplicator = Deduplicator()
+        self.deduplicator = None
         self.scrapers = []
-        self.initialize_firebase()
+        self.sink = sink
+        if sink == 'firestore':
+            self.initialize_firebase()
+        self.store = open_sink(sink, db=self.db, path=sqlite_path if sink == 'sqlite' else jsonl_path)
+        if self.store.path:
+            logger.info(f"Writing articles to {self.store.path} (Firebase disabled)")
+        # Without the Admin SDK the local seen index is the only record of what is stored
+        self.deduplicator = ArticleDeduplicator(self.db, seen_index=SeenIndex(self.store.seen_index_path))
+        self.trends = TrendTracker(self.store.trending_state_path)
+        self.write_log = None
+        if write_behind:
+            self.write_log = WriteBehindLog(self.store, on_written=self.deduplicator.mark_seen,
+                                            on_updated=self.trends.mark_written)
+        self.categorizer = Categorizer()
         self.initialize_scrapers()
     
     def initialize_firebase(self):
         """Initialize Firebase Admin SDK"""
         try:
+            import firebase_admin
+            from firebase_admin import credentials, firestore
+            
             # Check if already initialized
             if not firebase_admin._apps:
                 cred_path = os.getenv('FIREBASE_CREDENTIALS_PATH', './firebase-credentials.json')
@@ -60,68 +105,329 @@ class NewsScraperOrchestrator:
     
     def initialize_scrapers(self):
         """Initialize all news source scrapers"""
-        self.scrapers = [
-            BleepingComputerScraper()
-        ]
+        from sources.registry import sources_for
+        self.scrapers = sources_for('orchestrator')
         logger.info(f"Initialized {len(self.scrapers)} scrapers")
     
-    def scrape_all_sources(self) -> List[Dict]:
-        """Scrape all configured news sources"""
-        all_articles = []
+    def _fetch_stage(self, scraper):
+        """Fetch a source's feed and fan out its new entries"""
+        logger.info(f"Scraping {scraper.source_name}...")
+        scraper.last_error = None
+        try:
+            # Skip downloading pages for articles we already stored
+            entries = scraper.fetch_entries(seen_filter=self.deduplicator.unseen_urls)
+        except Exception as e:
+            scraper.last_error = e
+            raise
+        logger.info(f"Found {len(entries)} new entries from {scraper.source_name}")
+        # Page downloads for this fetch share one deadline, however they are spread over workers
+        deadline = scraper.enrich_deadline()
+        return [(scraper, entry, deadline) for entry in entries]
+    
+    def _parse_stage(self, item):
+        scraper, entry, deadline = item
+        article = scraper.parse_entry(entry)
+        ENTRIES_PARSED.inc(source=scraper.source_name)
+        return [(scraper, article, deadline)]
+    
+    def _enrich_stage(self, item):
+        scraper, article, deadline = item
+        return [scraper.enrich(article, deadline)]
+    
+    def _dedupe_stage(self, article):
+        return [article] if self.deduplicator.accept(article) else []
+    
+    def _categorize_stage(self, article):
+        return [self.categorizer.categorize(article)]
+    
+    def run_pipeline(self, scrapers) -> Dict:
+        """Stream sources through fetch -> parse -> enrich -> dedupe -> categorize -> write"""
+        totals = {'saved': 0, 'skipped': 0}
+        failed_sources = set()
+        reset_retry_budget()
+        
+        def write_batch(articles):
+            self.trends.observe_many(articles)
+            saved, skipped = self.save_articles(articles)
+            totals['saved'] += saved
+            totals['skipped'] += skipped
+        
+        def write_failed(articles, error):
+            self.deduplicator.forget(articles)
+            failed_sources.update(article['sourceName'] for article in articles)
+        
+        scraper_name = lambda scraper: scraper.source_name
+        item_source = lambda item: item[0].source_name
+        article_source = lambda article: article.get('sourceName', '')
+        pipeline = Pipeline([
+            Stage('fetch', self._fetch_stage, STAGE_WORKERS['fetch'], scraper_name),
+            Stage('parse', self._parse_stage, STAGE_WORKERS['parse'], item_source),
+            Stage('enrich', self._enrich_stage, STAGE_WORKERS['enrich'], item_source),
+            Stage('dedupe', self._dedupe_stage, STAGE_WORKERS['dedupe'], article_source),
+            Stage('categorize', self._categorize_stage, STAGE_WORKERS['categorize'], article_source),
+        ], BatchSink(write_batch, batch_size=WRITE_BATCH_SIZE, on_error=write_failed), queue_size=QUEUE_SIZE)
+        
+        stats = pipeline.run(scrapers)
+        stats.update(totals)
+        if self.write_log is not None:
+            # Scores are only written for stored articles, so let this run's writes land first
+            self.write_log.flush(WRITE_BEHIND_FLUSH_TIMEOUT)
+        stats['trending_updates'] = self.write_trending()
+        stats['failed_sources'] = sorted(failed_sources)
+        
+        # Remember feed validators only after articles are stored; a source
+        # whose batch failed keeps its old ones so the lost articles are refetched
+        feed_state = default_store()
+        for scraper in scrapers:
+            if scraper.source_name in failed_sources:
+                feed_state.discard(state_key(scraper.rss_url, scraper.consumer))
+        feed_state.save()
+        return stats
+    
+    def write_trending(self) -> int:
+        """Bulk-write trending scores that changed for already stored articles"""
+        updates = self.trends.pending_updates()
+        stored = self.deduplicator.existing_ids(updates)
+        updates = {article_id: fields for article_id, fields in updates.items() if article_id in stored}
+        if not updates:
+            return 0
+        
+        if self.write_log is not None:
+            # Marked as written by the log once the sink confirms them
+            queued = self.write_log.append_updates(updates)
+            logger.info(f"Queued trending score updates for {queued} stored articles")
+            return queued
+        
+        try:
+            updated = self.store.update(updates)
+        except Exception as e:
+            logger.error(f"Error writing {len(updates)} trending updates: {e}")
+            return 0
+        
+        self.trends.mark_written({article_id: updates[article_id] for article_id in updated})
+        TRENDING_UPDATES.inc(len(updated), sink=self.store.name)
+        logger.info(f"Updated trending scores of {len(updated)} stored articles")
+        return len(updated)
+    
+    def save_articles(self, articles: List[Dict], strict: bool = False):
+        """Hand a batch to storage; returns (saved or queued, skipped).
+        
+        With the write-behind log the batch is only appended to it and
+        written in the background, so slow storage never stalls scraping.
+        strict writes synchronously even then (queue workers must not
+        complete tasks before they are stored). Write errors are raised so
+        the caller can keep the batch for a retry.
+        """
+        if self.write_log is not None and not strict:
+            queued = self.write_log.append(articles)
+            logger.info(f"Queued {queued} articles for {self.store.name} ({self.write_log.pending} pending)")
+            return queued, 0
+        
+        try:
+            saved_ids, skipped_count = self.store.write(articles)
+        except Exception as e:
+            logger.error(f"Error saving {len(articles)} articles to {self.store.name}: {e}")
+            raise
+        
+        self.deduplicator.mark_seen(saved_ids)
+        ARTICLES_WRITTEN.inc(len(saved_ids), sink=self.store.name)
+        
+        logger.info(f"Saved {len(saved_ids)} new articles, skipped {skipped_count} duplicates")
+        return len(saved_ids), skipped_count
+    
+    def run_source(self, scraper) -> int:
+        """Scrape, deduplicate and save a single source; returns articles saved"""
+        stats = self.run_pipeline([scraper])
+        if scraper.last_error:
+            raise scraper.last_error
+        if stats['failed_sources']:
+            raise RuntimeError(f"{stats['failed']} {scraper.source_name} articles could not be written")
+        return stats['saved']
+    
+    def run_daemon(self, min_interval: float, max_interval: float, initial_interval: float,
+                   metrics_port: int = 0):
+        """Poll every source forever on its own adaptive interval"""
+        if metrics_port:
+            REGISTRY.serve(metrics_port)
+            logger.info(f"Serving metrics on http://127.0.0.1:{metrics_port}/metrics")
+        scheduler = AdaptiveScheduler(min_interval, max_interval, initial_interval)
+        
+        def poll(scraper):
+            def job():
+                saved = self.run_source(scraper)
+                pruned = self.deduplicator.prune()
+                if pruned:
+                    logger.info(f"Pruned {pruned} titles outside the dedupe window")
+                write_metrics()
+                return saved
+            return job
         
         for scraper in self.scrapers:
+            scheduler.add(scraper.source_name, poll(scraper))
+        
+        signal.signal(signal.SIGTERM, lambda *_: scheduler.stop())
+        logger.info(f"Daemon polling {len(self.scrapers)} sources "
+                    f"every {min_interval:.0f}-{max_interval:.0f}s")
+        try:
+            scheduler.run_forever()
+        finally:
+            self.close()
+        logger.info("Daemon stopped")
+    
+    def seed_queue(self, queue):
+        """Make sure every source has its recurring poll task (idempotent)"""
+        added = sum(queue.enqueue('source', scraper.source_name) for scraper in self.scrapers)
+        if added:
+            logger.info(f"Queued {added} new source tasks")
+    
+    def _work_sources(self, queue, heartbeat, owner: str, scheduler: AdaptiveScheduler,
+                      pool: ThreadPoolExecutor) -> int:
+        """Poll due sources and queue one article task per new entry"""
+        from fetcher import entry_to_payload
+        
+        by_name = {scraper.source_name: scraper for scraper in self.scrapers}
+        tasks = queue.lease(owner, limit=STAGE_WORKERS['fetch'], lease_seconds=heartbeat.lease_seconds, kinds=('source',))
+        heartbeat.track(tasks)
+        
+        def poll(task) -> Optional[int]:
+            scraper = by_name.get(task.key)
             try:
-                logger.info(f"Scraping {scraper.source_name}...")
-                articles = scraper.scrape()
-                logger.info(f"Found {len(articles)} articles from {scraper.source_name}")
-                all_articles.extend(articles)
-                
-                # Rate limiting between sources
-                time.sleep(2)
+                if scraper is None:
+                    raise LookupError(f"no source named {task.key} in this worker")
+                entries = scraper.fetch_entries(seen_filter=self.deduplicator.unseen_urls)
+                return sum(
+                    queue.enqueue('article', self.deduplicator.generate_article_id(entry.link),
+                                  {'source': scraper.source_name, 'entry': entry_to_payload(entry)})
+                    for entry in entries
+                )
             except Exception as e:
-                logger.error(f"Error scraping {scraper.source_name}: {e}")
-                continue
+                logger.error(f"Polling {task.key} failed: {e}")
+                return None
         
-        return all_articles
-    
-    def deduplicate_articles(self, articles: List[Dict]) -> List[Dict]:
-        """Remove duplicate articles"""
-        logger.info(f"Deduplicating {len(articles)} articles...")
-        unique_articles = self.deduplicator.deduplicate(articles)
-        logger.info(f"After deduplication: {len(unique_articles)} unique articles")
-        return unique_articles
+        for task, new_items in zip(tasks, pool.map(poll, tasks)):
+            state = PollState(task.key, None, task.payload.get('interval', scheduler.initial_interval))
+            state.failures = task.payload.get('failures', 0)
+            interval = scheduler.next_interval(state, new_items)
+            if new_items is not None:
+                state.interval = interval
+            queue.complete(owner, task, reschedule_at=time.time() + interval,
+                           payload={'interval': state.interval, 'failures': state.failures})
+            logger.info(f"{task.key}: queued {new_items or 0} articles, next poll in {interval:.0f}s")
+        heartbeat.untrack(tasks)
+        return len(tasks)
     
-    def save_to_firestore(self, articles: List[Dict]):
-        """Save articles to Firestore"""
-        saved_count = 0
-        skipped_count = 0
+    def _work_articles(self, queue, heartbeat, owner: str, pool: ThreadPoolExecutor) -> int:
+        """Scrape, categorize and write one batch of article tasks"""
+        from fetcher import entry_from_payload
+        
+        by_name = {scraper.source_name: scraper for scraper in self.scrapers}
+        tasks = queue.lease(owner, limit=WRITE_BATCH_SIZE, lease_seconds=heartbeat.lease_seconds, kinds=('article',))
+        if not tasks:
+            return 0
+        heartbeat.track(tasks)
+        deadlines = {name: scraper.enrich_deadline() for name, scraper in by_name.items()}
+        
+        def scrape(task):
+            scraper = by_name[task.payload['source']]
+            article = scraper.parse_entry(entry_from_payload(task.payload['entry']))
+            ENTRIES_PARSED.inc(source=scraper.source_name)
+            return scraper.enrich(article, deadlines[scraper.source_name])
         
-        for article in articles:
+        futures = [(task, pool.submit(scrape, task)) for task in tasks]
+        done = []
+        articles = []
+        for task, future in futures:
             try:
-                # Check if article already exists
-                existing = self.db.collection('newsArticles').where('url', '==', article['url']).limit(1).get()
-                
-                if len(list(existing)) > 0:
-                    logger.debug(f"Article already exists: {article['title']}")
-                    skipped_count += 1
-                    continue
-                
-                # Add metadata
-                article['scrapedAt'] = firestore.SERVER_TIMESTAMP
-                article['views'] = 0
-                article['trending'] = False
-                
-                # Save to Firestore
-                self.db.collection('newsArticles').add(article)
-                saved_count += 1
-                logger.info(f"Saved: {article['title']}")
-                
+                article = future.result()
             except Exception as e:
-                logger.error(f"Error saving article '{article.get('title', 'Unknown')}': {e}")
+                queue.fail(owner, task, str(e))
                 continue
+            done.append(task)
+            if self.deduplicator.accept(article):
+                articles.append(self.categorizer.categorize(article))
+        
+        # Another worker owns anything whose lease lapsed; leave its write to them
+        # (forget them here, or whoever retries them would drop them as duplicates)
+        lost = {task.key for task in done if heartbeat.lost(task)}
+        if lost:
+            self.deduplicator.forget(a for a in articles if self.deduplicator.generate_article_id(a['url']) in lost)
+            articles = [a for a in articles if self.deduplicator.generate_article_id(a['url']) not in lost]
+            done = [task for task in done if task.key not in lost]
+        try:
+            if articles:
+                self.trends.observe_many(articles)
+                self.save_articles(articles, strict=True)
+        except Exception as e:
+            self.deduplicator.forget(articles)
+            for task in done:
+                queue.fail(owner, task, f"write failed: {e}")
+        else:
+            for task in done:
+                queue.complete(owner, task)
+        heartbeat.untrack(tasks)
+        return len(tasks)
+    
+    def run_worker(self, queue, min_interval: float, max_interval: float, initial_interval: float,
+                   once: bool = False, idle_sleep: float = 2.0, metrics_port: int = 0):
+        """Lease source and article tasks from a shared queue until stopped.
+        
+        Any number of workers (processes or hosts sharing the queue backend)
+        can run side by side: each source poll and each article is leased
+        by exactly one of them. With once=True, exit when nothing is due.
+        """
+        from work_queue import DONE_RETENTION, LEASE_SECONDS, Heartbeat
+        
+        if metrics_port:
+            REGISTRY.serve(metrics_port)
+        owner = f"{socket.gethostname()}:{os.getpid()}"
+        scheduler = AdaptiveScheduler(min_interval, max_interval, initial_interval)
+        heartbeat = Heartbeat(queue, owner, LEASE_SECONDS).start()
+        pool = ThreadPoolExecutor(max_workers=STAGE_WORKERS['enrich'], thread_name_prefix='article')
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        
+        self.seed_queue(queue)
+        logger.info(f"Worker {owner} leasing from the queue ({len(self.scrapers)} sources)")
         
-        logger.info(f"Saved {saved_count} new articles, skipped {skipped_count} duplicates")
-        return saved_count, skipped_count
+        def prune() -> float:
+            pruned = queue.prune(time.time() - DONE_RETENTION)
+            if pruned:
+                logger.info(f"Pruned {pruned} finished tasks")
+            return time.time() + LEASE_SECONDS
+        
+        next_prune = 0.0
+        try:
+            while not stop.is_set():
+                reset_retry_budget()
+                worked = self._work_sources(queue, heartbeat, owner, scheduler, pool)
+                worked += self._work_articles(queue, heartbeat, owner, pool)
+                if worked:
+                    # A worker that is never idle still prunes once per lease period
+                    if time.time() >= next_prune:
+                        next_prune = prune()
+                    continue
+                next_prune = prune()
+                self.write_trending()
+                default_store().save()
+                write_metrics()
+                if once:
+                    break
+                stop.wait(idle_sleep)
+        finally:
+            heartbeat.stop()
+            pool.shutdown(wait=True)
+            self.close()
+            logger.info(f"Worker {owner} stopped; queue: {queue.stats()}")
+            queue.close()
+    
+    def close(self):
+        """Drain the write-behind log, then release every store"""
+        if self.write_log is not None:
+            self.write_log.close()
+            logger.info(f"Write-behind log: {self.write_log.written} written, {self.write_log.skipped} skipped")
+        self.categorizer.close()
+        self.trends.close()
+        self.store.close()
     
     def run(self):
         """Main execution method"""
@@ -131,38 +437,73 @@ class NewsScraperOrchestrator:
         logger.info("=" * 80)
         
         try:
-            # Step 1: Scrape all sources
-            articles = self.scrape_all_sources()
-            
-            if not articles:
-                logger.warning("No articles found from any source")
-                return
-            
-            # Step 2: Deduplicate
-            unique_articles = self.deduplicate_articles(articles)
-            
-            # Step 3: Save to Firestore
-            saved, skipped = self.save_to_firestore(unique_articles)
+            stats = self.run_pipeline(self.scrapers)
             
             # Summary
-            elapsed_time = time.time() - start_time
             logger.info("=" * 80)
             logger.info("Scraping Complete!")
-            logger.info(f"Total articles scraped: {len(articles)}")
-            logger.info(f"Unique articles: {len(unique_articles)}")
-            logger.info(f"Saved to database: {saved}")
-            logger.info(f"Skipped (already exists): {skipped}")
-            logger.info(f"Time elapsed: {elapsed_time:.2f} seconds")
+            for name, stage in stats['stages'].items():
+                logger.info(f"  {name:<10} workers={stage['workers']} in={stage['in']} out={stage['out']} "
+                            f"errors={stage['errors']} busy={stage['busy']:.2f}s")
+            logger.info(f"{'Queued for' if self.write_log else 'Saved to'} database: {stats['saved']}")
+            logger.info(f"Skipped (already exists): {stats['skipped']}")
+            if stats['failed']:
+                logger.warning(f"Failed to write {stats['failed']} articles from "
+                               f"{', '.join(stats['failed_sources'])}; they will be fetched again next run")
+            logger.info(f"Trending scores updated: {stats['trending_updates']}")
+            if stats['first_write'] is not None:
+                logger.info(f"Time to first write: {stats['first_write']:.2f} seconds")
+            logger.info(f"Time elapsed: {time.time() - start_time:.2f} seconds")
             logger.info("=" * 80)
             
         except Exception as e:
             logger.error(f"Fatal error during scraping: {e}", exc_info=True)
             raise
+        finally:
+            self.close()
+            write_metrics()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="CyberTrack news scraper")
+    parser.add_argument('--sink', choices=SINKS, default=os.getenv('SCRAPER_SINK', 'firestore'),
+                        help="where to write articles: Firestore (Admin SDK or REST), or a local SQLite/JSONL file")
+    parser.add_argument('--jsonl-path', default=None,
+                        help="output file for --sink=jsonl (default: JSONL_PATH or articles.jsonl)")
+    parser.add_argument('--sqlite-path', default=None,
+                        help="output file for --sink=sqlite (default: SQLITE_PATH or articles.sqlite3)")
+    parser.add_argument('--daemon', action='store_true',
+                        help="keep running and poll each source on an adaptive interval")
+    parser.add_argument('--min-interval', type=float, default=float(os.getenv('POLL_MIN_INTERVAL', '120')),
+                        help="shortest polling interval in seconds (daemon mode)")
+    parser.add_argument('--max-interval', type=float, default=float(os.getenv('POLL_MAX_INTERVAL', '3600')),
+                        help="longest polling interval in seconds (daemon mode)")
+    parser.add_argument('--initial-interval', type=float, default=float(os.getenv('POLL_INITIAL_INTERVAL', '600')),
+                        help="starting polling interval in seconds (daemon mode)")
+    parser.add_argument('--worker', action='store_true',
+                        help="lease sources and articles from the shared work queue (run several to scale out)")
+    parser.add_argument('--queue', default=None,
+                        help="work queue URL for --worker (default: WORK_QUEUE_URL or a local SQLite file)")
+    parser.add_argument('--once', action='store_true',
+                        help="with --worker, exit once no task is due instead of waiting for more")
+    parser.add_argument('--metrics-port', type=int, default=int(os.getenv('METRICS_PORT', '0')),
+                        help="serve Prometheus metrics on this port (daemon/worker mode, 0 disables)")
+    return parser.parse_args()
 
 if __name__ == "__main__":
+    args = parse_args()
     try:
-        orchestrator = NewsScraperOrchestrator()
-        orchestrator.run()
+        # Workers write synchronously: the queue only completes a task once it is stored
+        orchestrator = NewsScraperOrchestrator(sink=args.sink, jsonl_path=args.jsonl_path, sqlite_path=args.sqlite_path,
+                                               write_behind=WRITE_BEHIND and not args.worker)
+        if args.worker:
+            from work_queue import WORK_QUEUE_URL, open_queue
+            orchestrator.run_worker(open_queue(args.queue or WORK_QUEUE_URL), args.min_interval, args.max_interval,
+                                    args.initial_interval, once=args.once, metrics_port=args.metrics_port)
+        elif args.daemon:
+            orchestrator.run_daemon(args.min_interval, args.max_interval, args.initial_interval,
+                                    args.metrics_port)
+        else:
+            orchestrator.run()
     except KeyboardInterrupt:
         logger.info("Scraping interrupted by user")
         sys.exit(0)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Single-pass keyword, industry and CVE matching"""
+
+import re
+from typing import Dict, List, NamedTuple
+
+CVE_PATTERN = r'cve-\d{4}-\d{4,7}'
+
+# Industry keywords
+INDUSTRY_KEYWORDS = {
+    'Healthcare': ['hospital', 'health', 'medical', 'patient', 'healthcare'],
+    'Finance': ['bank', 'financial', 'payment', 'credit', 'fintech', 'crypto'],
+    'Government': ['government', 'federal', 'military', 'defense', 'agency'],
+    'Education': ['university', 'school', 'education', 'student', 'college'],
+    'Retail': ['retail', 'store', 'shopping', 'ecommerce'],
+    'Technology': ['software', 'tech', 'cloud', 'saas', 'microsoft', 'google']
+}
+
+
+class MatchResult(NamedTuple):
+    keywords: List[str]  # Distinct keyword hits, in order of first appearance
+    labels: List[str]    # Every matching label, in definition order
+    cves: List[str]      # Distinct upper-cased CVE IDs, in order of appearance
+
+
+def _trie_pattern(words: List[str]) -> str:
+    """Compile words into a prefix-factored regex (one branch per first letter)"""
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node: Dict) -> str:
+        terminal = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if terminal:
+            return '(?:' + body + ')?'
+        return body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Scan text once for every keyword of every label, plus CVE IDs.
+
+    Keywords are plain substrings (like the `keyword in text` checks this
+    replaces). All keywords are folded into one trie-shaped regex inside a
+    lookahead, so each position of the lower-cased text is tried once and the
+    cost stays flat as the keyword lists grow. The regex reports the longest
+    keyword at a position; shorter keywords that are its prefixes are credited
+    from a table built at compile time, so overlapping hits are never lost.
+    """
+
+    def __init__(self, keywords_by_label: Dict[str, List[str]]):
+        self.label_order = list(keywords_by_label)
+        keyword_labels: Dict[str, List[str]] = {}
+        for label, keywords in keywords_by_label.items():
+            for keyword in keywords:
+                keyword_labels.setdefault(keyword.lower(), []).append(label)
+
+        # Each keyword also implies every shorter keyword that is its prefix
+        self._implied: Dict[str, List[str]] = {
+            keyword: [other for other in keyword_labels if keyword.startswith(other)]
+            for keyword in keyword_labels
+        }
+        self._keyword_labels = keyword_labels
+        keyword_pattern = _trie_pattern(list(keyword_labels)) or '(?!)'
+        self._regex = re.compile(f'(?=({CVE_PATTERN})|({keyword_pattern}))')
+
+    def labels_of(self, keyword: str) -> List[str]:
+        """Labels a matched keyword belongs to"""
+        return self._keyword_labels.get(keyword, [])
+
+    def scan(self, text: str) -> MatchResult:
+        keywords: Dict[str, None] = {}
+        labels = set()
+        cves: Dict[str, None] = {}
+        for match in self._regex.finditer(text.lower()):
+            cve, keyword = match.group(1), match.group(2)
+            if cve:
+                cves[cve.upper()] = None
+            elif keyword:
+                for hit in self._implied[keyword]:
+                    if hit not in keywords:
+                        keywords[hit] = None
+                        labels.update(self._keyword_labels[hit])
+        return MatchResult(
+            keywords=list(keywords),
+            labels=[label for label in self.label_order if label in labels],
+            cves=list(cves),
+        )
+
+
+INDUSTRY_MATCHER = KeywordMatcher(INDUSTRY_KEYWORDS)
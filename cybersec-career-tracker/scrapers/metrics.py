@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""Per-source and per-stage scraper metrics in Prometheus text format"""
+
+import abc
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from atomic_file import atomic_write
+
+METRICS_FILE = os.getenv('METRICS_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'metrics.prom'))
+
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+class Metric(abc.ABC):
+    kind = 'untyped'
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}'] + self._samples()
+
+    @abc.abstractmethod
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f'{self.name}{_format_labels(self.label_names, key)} {value:g}' for key, value in items]
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[LabelValues, List[float]] = {}  # bucket counts + [sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        lines = []
+        for key, state in items:
+            for index, bound in enumerate(self.buckets):
+                labels = _format_labels(self.label_names, key, 'le="%g"' % bound)
+                lines.append(f'{self.name}_bucket{labels} {state[index]:g}')
+            labels = _format_labels(self.label_names, key, 'le="+Inf"')
+            lines.append(f'{self.name}_bucket{labels} {state[-1]:g}')
+            lines.append(f'{self.name}_sum{_format_labels(self.label_names, key)} {state[-2]:.6f}')
+            lines.append(f'{self.name}_count{_format_labels(self.label_names, key)} {state[-1]:g}')
+        return lines
+
+
+class Registry:
+    """Holds metrics and renders them in Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path: str = METRICS_FILE):
+        """Atomically write the current metrics (e.g. for node_exporter's textfile collector)"""
+        atomic_write(path, self.render().encode('utf-8'))
+
+    def serve(self, port: int, host: str = '127.0.0.1'):
+        """Expose /metrics over HTTP from a background thread"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+        return server
+
+
+REGISTRY = Registry()
+
+FETCH_SECONDS = REGISTRY.histogram('scraper_fetch_seconds', 'Feed and article download latency', ['source', 'kind'])
+FETCH_BYTES = REGISTRY.counter('scraper_fetch_bytes_total', 'Bytes downloaded', ['source', 'kind'])
+FETCH_NOT_MODIFIED = REGISTRY.counter('scraper_fetch_not_modified_total', 'Feed fetches skipped as unchanged', ['source'])
+ENTRIES_PARSED = REGISTRY.counter('scraper_entries_parsed_total', 'Feed entries parsed into articles', ['source'])
+DUPLICATES_DROPPED = REGISTRY.counter('scraper_duplicates_dropped_total', 'Articles dropped as duplicates', ['kind'])
+ARTICLES_WRITTEN = REGISTRY.counter('scraper_articles_written_total', 'Articles written to storage', ['sink'])
+FIRESTORE_RPCS = REGISTRY.counter('scraper_firestore_rpcs_total', 'Firestore RPCs issued', ['op'])
+FIRESTORE_SECONDS = REGISTRY.histogram('scraper_firestore_rpc_seconds', 'Firestore RPC latency', ['op'])
+STAGE_SECONDS = REGISTRY.histogram('scraper_stage_seconds', 'Time spent per item in each pipeline stage', ['stage'])
+ERRORS = REGISTRY.counter('scraper_errors_total', 'Errors by source and stage', ['source', 'stage'])
+TRENDING_UPDATES = REGISTRY.counter('scraper_trending_updates_total', 'Trending scores written back', ['sink'])
+CATEGORY_CACHE = REGISTRY.counter('scraper_category_cache_total', 'Categorizer cache lookups', ['result'])
+HTTP_RETRIES = REGISTRY.counter('scraper_http_retries_total', 'HTTP requests retried', ['host', 'reason'])
+HTTP_HEDGES = REGISTRY.counter('scraper_http_hedges_total', 'Hedged requests sent, by which copy answered first', ['host', 'result'])
+RETRY_BUDGET_EXHAUSTED = REGISTRY.counter('scraper_retry_budget_exhausted_total', 'Retries or hedges refused by the per-run budget')
+SOURCES_SKIPPED = REGISTRY.counter('scraper_source_skipped_total', 'Polls skipped while a source circuit is open', ['source'])
+WRITE_BEHIND_FLUSHES = REGISTRY.counter('scraper_write_behind_flushes_total', 'Write-behind batches sent to storage', ['result'])
+
+
+@contextmanager
+def firestore_rpc(op: str):
+    """Count and time one Firestore round trip"""
+    FIRESTORE_RPCS.inc(op=op)
+    with FIRESTORE_SECONDS.time(op=op):
+        yield
+
+
+def write_metrics(path: Optional[str] = None):
+    try:
+        REGISTRY.write_textfile(path or METRICS_FILE)
+    except OSError as e:
+        print(f"Could not write metrics to {path or METRICS_FILE}: {e}")
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""Incremental, paginated news output for the React app"""
+
+import gzip
+import hashlib
+import itertools
+import json
+import os
+import re
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from atomic_file import atomic_write
+from timeline import parse_timestamp
+
+PUBLIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'public')
+PAGE_SIZE = int(os.getenv('NEWS_PAGE_SIZE', '50'))
+LEGACY_LIMIT = int(os.getenv('NEWS_LEGACY_LIMIT', '100'))
+# .seen covers the items of the head page and this many newest sealed pages
+SEEN_PAGES = int(os.getenv('NEWS_SEEN_PAGES', '20'))
+# Precompressed copies written next to every output, for static hosts to serve as-is
+SIDECARS = tuple(ext for ext in os.getenv('NEWS_SIDECARS', 'gz,br').split(',') if ext)
+FACETS = ('category', 'severity', 'industry', 'cve')
+# Newest entries kept per facet value, and values listed per facet (older ones keep their files)
+FACET_LIMIT = int(os.getenv('NEWS_FACET_LIMIT', '500'))
+FACET_VALUES_LIMIT = int(os.getenv('NEWS_FACET_VALUES', '500'))
+FACET_FORMAT = 2  # Bumped when index files change shape; older ones are rebuilt from the pages
+
+
+def _gzip(data: bytes) -> bytes:
+    return gzip.compress(data, compresslevel=9, mtime=0)  # mtime=0 keeps output reproducible
+
+
+_brotli_warned = False
+
+
+def _brotli(data: bytes) -> Optional[bytes]:
+    global _brotli_warned
+    try:
+        import brotli
+    except ImportError:
+        if not _brotli_warned:
+            print("  ⚠️ brotli not installed (pip install -r requirements-extra.txt), skipping .br files")
+            _brotli_warned = True
+        return None
+    return brotli.compress(data, quality=11)
+
+
+COMPRESSORS: Dict[str, Callable[[bytes], Optional[bytes]]] = {'gz': _gzip, 'br': _brotli}
+
+
+def publish(path: str, data: bytes, sidecars: Tuple[str, ...] = SIDECARS):
+    """atomic_write a file and its precompressed .gz/.br copies"""
+    for ext in sidecars:
+        compressed = COMPRESSORS[ext](data)
+        if compressed is not None:
+            atomic_write(f'{path}.{ext}', compressed)
+        elif os.path.exists(f'{path}.{ext}'):
+            os.unlink(f'{path}.{ext}')  # Never leave a stale copy to be served
+    atomic_write(path, data)
+
+
+def slug(value: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '-', value.lower()).strip('-') or '_'
+
+
+def item_facets(item: Dict) -> Dict[str, List[str]]:
+    """Facet values of an exported item (see NewsExporter.describe)"""
+    return {
+        'category': [item['category']] if item.get('category') else [],
+        'severity': [item['severity']] if item.get('severity') else [],
+        'industry': list(item.get('industries') or []),
+        'cve': list(item.get('cveIds') or []),
+    }
+
+
+def item_timestamp(item: Dict) -> float:
+    """Sort key: publishedTs, or the parsed `published` string for older items"""
+    timestamp = item.get('publishedTs')
+    if timestamp is None:
+        timestamp = parse_timestamp(item.get('published'))
+    return timestamp or 0.0
+
+
+def dump_compact(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class NewsExporter:
+    """Merges new items into fixed-size JSON pages plus a small manifest.
+
+    Pages are numbered in the order they fill up. New items land in the
+    newest ("head") page; once it holds page_size items it is sealed. A
+    sealed page is only rewritten when a late item falls inside its date
+    range (it splits if that overflows it), so each run writes a few small
+    files no matter how much history has built up and every page stays
+    newest first. manifest.json lists pages newest first, and the legacy
+    cyber_news.json keeps only the newest items for older clients.
+
+    Pages and the manifest are published before the fingerprints of their
+    items are recorded. Rewritten pages drop items they already hold, so a
+    run that repeats an interrupted one does not duplicate anything. .seen
+    only covers the head and the newest seen_pages sealed pages: once it
+    holds twice that many fingerprints it is rebuilt from those pages, and
+    a late item older than them is checked against the page it would join.
+
+    Items also get an id plus category, severity, industries and cveIds, and
+    index/<facet>/<value>.json lists stubs (id, title, link, published, ts)
+    of the newest facet_limit items per value, so a filtered view is one
+    small fetch; ts finds the full item's page through the manifest's
+    newest/oldest ranges. index/<facet>.json lists the facet_values_limit
+    most recently updated values. The index files are their own state:
+    a run reads and rewrites only those of values that gained items. Every
+    public file is published with .gz/.br sidecars.
+    """
+
+    def __init__(self, public_dir: str = PUBLIC_DIR, page_size: int = PAGE_SIZE,
+                 key: Callable[[Dict], str] = lambda item: item['link'],
+                 sort_key: Callable[[Dict], object] = item_timestamp,
+                 legacy_file: Optional[str] = 'cyber_news.json', legacy_limit: int = LEGACY_LIMIT,
+                 facet_limit: int = FACET_LIMIT, facet_values_limit: int = FACET_VALUES_LIMIT,
+                 seen_pages: int = SEEN_PAGES):
+        self.public_dir = public_dir
+        self.out_dir = os.path.join(public_dir, 'news')
+        self.page_size = max(1, page_size)
+        self.key = key
+        self.sort_key = sort_key
+        self.legacy_file = legacy_file
+        self.legacy_limit = legacy_limit
+        self.facet_limit = max(1, facet_limit)
+        self.facet_values_limit = max(1, facet_values_limit)
+        self.seen_pages = max(0, seen_pages)
+        self.manifest_path = os.path.join(self.out_dir, 'manifest.json')
+        self.seen_path = os.path.join(self.out_dir, '.seen')
+        self.index_dir = os.path.join(self.out_dir, 'index')
+
+    @staticmethod
+    def _page_file(number: int) -> str:
+        return f'page-{number:06d}.json'
+
+    @staticmethod
+    def _page_number(file_name: str) -> int:
+        return int(file_name[5:11])
+
+    def _read_json(self, path: str, default):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return default
+
+    def _fingerprint(self, item: Dict) -> str:
+        return hashlib.md5(self.key(item).encode('utf-8')).hexdigest()[:16]
+
+    def load_manifest(self) -> Dict:
+        return self._read_json(self.manifest_path, {'pageSize': self.page_size, 'total': 0, 'pages': []})
+
+    def load_page(self, file_name: str) -> List[Dict]:
+        return self._read_json(os.path.join(self.out_dir, file_name), [])
+
+    def _load_seen(self) -> set:
+        try:
+            with open(self.seen_path, 'r', encoding='utf-8') as f:
+                return {line.strip() for line in f if line.strip()}
+        except OSError:
+            return set()
+
+    def describe(self, item: Dict) -> bool:
+        """Fill in id and facet fields the item lacks; returns True if it changed"""
+        missing = [field for field in ('id', 'category', 'severity', 'industries', 'cveIds') if field not in item]
+        if not missing:
+            return False
+        from categorizer import classify_text
+        from deduplicator import generate_article_id
+        from matcher import INDUSTRY_MATCHER
+
+        title, summary = item.get('title', ''), item.get('summary', '')
+        item.setdefault('id', generate_article_id(self.key(item)))
+        if 'category' in missing or 'severity' in missing:
+            result = classify_text(title, summary)
+            item.setdefault('category', result['primaryCategory'])
+            item.setdefault('severity', result['severity'])
+        if 'industries' in missing or 'cveIds' in missing:
+            matches = INDUSTRY_MATCHER.scan(f"{title}\n{summary}")
+            item.setdefault('industries', matches.labels or ['Technology'])
+            item.setdefault('cveIds', matches.cves[:3])
+        return True
+
+    def _index_file(self, facet: str, value: str) -> str:
+        return f'index/{facet}/{slug(value)}.json'
+
+    @staticmethod
+    def _listing_file(facet: str) -> str:
+        return f'index/{facet}.json'
+
+    def _stub(self, item: Dict) -> Dict:
+        return {'id': item['id'], 'title': item.get('title', ''), 'link': item.get('link', ''),
+                'published': item.get('published', ''), 'ts': self.sort_key(item)}
+
+    def _group(self, items: List[Dict]) -> Dict[Tuple[str, str], List[Dict]]:
+        """Stubs of the items per (facet, value)"""
+        groups: Dict[Tuple[str, str], List[Dict]] = {}
+        for item in items:
+            for facet, values in item_facets(item).items():
+                for value in values:
+                    groups.setdefault((facet, value), []).append(self._stub(item))
+        return groups
+
+    def _describe_pages(self, manifest: Dict) -> List[Dict]:
+        """Read every exported item, filling in facet fields (rewrites pages that lacked them once)"""
+        items: List[Dict] = []
+        for page in manifest['pages']:
+            page_items = self.load_page(page['file'])
+            changed = [self.describe(item) for item in page_items]
+            if any(changed):
+                publish(os.path.join(self.out_dir, page['file']), dump_compact(page_items))
+            items.extend(page_items)
+        return items
+
+    def _write_indexes(self, groups: Dict[Tuple[str, str], List[Dict]], rebuild: bool = False) -> Dict[str, str]:
+        """Merge stubs into their values' index files and update the facet listings.
+
+        Returns the manifest's facet entry (facet -> listing file). With
+        rebuild, existing files are replaced instead of merged into.
+        """
+        updated: Dict[str, Dict[str, Dict]] = {}
+        for (facet, value), stubs in groups.items():
+            file_name = self._index_file(facet, value)
+            path = os.path.join(self.out_dir, file_name)
+            index = {} if rebuild else self._read_json(path, {})
+            entries = {entry['id']: entry for entry in index.get('items', [])}
+            added = 0
+            for stub in stubs:
+                if stub['id'] not in entries:
+                    entries[stub['id']] = stub
+                    added += 1
+            if not added:
+                continue
+            items = sorted(entries.values(), key=lambda entry: entry['ts'], reverse=True)[:self.facet_limit]
+            count = index.get('count', 0) + added
+            publish(path, dump_compact({'facet': facet, 'value': value, 'count': count, 'items': items}))
+            updated.setdefault(facet, {})[value] = {'file': file_name, 'count': count, 'newest': items[0]['ts']}
+
+        for facet, values in updated.items():
+            path = os.path.join(self.out_dir, self._listing_file(facet))
+            listing = {} if rebuild else self._read_json(path, {})
+            listing.update(values)
+            recent = sorted(listing.items(), key=lambda pair: pair[1]['newest'], reverse=True)
+            publish(path, dump_compact(dict(sorted(recent[:self.facet_values_limit]))))
+        return {facet: self._listing_file(facet) for facet in FACETS}
+
+    def _write_pages(self, items: List[Dict], numbers: Iterator[int]) -> List[Dict]:
+        """Publish items as pages filled from the oldest end; returns their manifest entries, newest first"""
+        unique: Dict[str, Dict] = {}
+        for item in items:
+            unique.setdefault(self._fingerprint(item), item)
+        items = sorted(unique.values(), key=self.sort_key, reverse=True)
+
+        written = []
+        while items:
+            if len(items) > self.page_size:
+                chunk, items = items[-self.page_size:], items[:-self.page_size]
+            else:
+                chunk, items = items, []
+            file_name = self._page_file(next(numbers))
+            publish(os.path.join(self.out_dir, file_name), dump_compact(chunk))
+            written.insert(0, {'file': file_name, 'count': len(chunk),
+                               'newest': self.sort_key(chunk[0]), 'oldest': self.sort_key(chunk[-1])})
+        return written
+
+    def newest(self, limit: int) -> List[Dict]:
+        """Read the newest `limit` items (touches only as many pages as needed)"""
+        items: List[Dict] = []
+        for page in self.load_manifest()['pages']:
+            items.extend(self.load_page(page['file']))
+            if len(items) >= limit:
+                break
+        return items[:limit]
+
+    def merge(self, items: List[Dict]) -> int:
+        """Add items not exported before; returns how many were new"""
+        if self.legacy_file and not os.path.exists(self.manifest_path):
+            # First paginated run: carry over the history from the old single file
+            legacy = self._read_json(os.path.join(self.public_dir, self.legacy_file), [])
+            items = list(items) + (legacy if isinstance(legacy, list) else [])
+        seen = self._load_seen()
+        fresh: Dict[str, Dict] = {}
+        for item in items:
+            fingerprint = self._fingerprint(item)
+            if fingerprint not in seen:
+                fresh.setdefault(fingerprint, item)
+        if not fresh:
+            return 0
+
+        manifest = self.load_manifest()
+        pages = manifest['pages']  # Newest first
+        # Pages exported before facets (or with an older index format) are indexed once
+        rebuild = manifest.get('facetFormat') != FACET_FORMAT
+        indexed = self._describe_pages(manifest) if rebuild else []
+        for item in fresh.values():
+            self.describe(item)
+        total = manifest.get('total', 0)
+        new_numbers = itertools.count(max((self._page_number(page['file']) for page in pages), default=0) + 1)
+        head = pages[0] if pages and pages[0]['count'] < self.page_size else None
+        sealed = pages[1:] if head else pages
+
+        # Items older than the newest sealed page belong to the sealed page
+        # covering their date; the rest go to the head
+        newer: List[Dict] = []
+        late: Dict[int, List[Dict]] = {}
+        for item in fresh.values():
+            timestamp = self.sort_key(item)
+            if not sealed or timestamp >= sealed[0]['newest']:
+                newer.append(item)
+                continue
+            index = next((i for i, page in enumerate(sealed) if timestamp >= page['oldest']), len(sealed) - 1)
+            late.setdefault(index, []).append(item)
+
+        # Full pages are sealed from the oldest end; the remainder becomes the head
+        written = []
+        if newer:
+            own = [self._page_number(head['file'])] if head else []
+            written = self._write_pages((self.load_page(head['file']) if head else []) + newer,
+                                        itertools.chain(own, new_numbers))
+        elif head:
+            written = [head]
+        for index, page in enumerate(sealed):
+            if index not in late:
+                written.append(page)
+                continue
+            page_items = self.load_page(page['file'])
+            # Pages past the .seen window may already hold some "fresh" items
+            known = {self._fingerprint(item) for item in page_items}
+            additions = [item for item in late[index] if self._fingerprint(item) not in known]
+            for item in late[index]:
+                if self._fingerprint(item) in known:
+                    del fresh[self._fingerprint(item)]
+            if additions:
+                written.extend(self._write_pages(page_items + additions,
+                                                 itertools.chain([self._page_number(page['file'])], new_numbers)))
+            else:
+                written.append(page)
+        if not fresh:
+            return 0
+
+        manifest['pages'] = written
+        manifest['pageSize'] = self.page_size
+        manifest['total'] = sum(page['count'] for page in manifest['pages'])
+        manifest['updatedAt'] = datetime.now().isoformat()
+
+        manifest['facets'] = self._write_indexes(self._group(indexed + list(fresh.values())), rebuild)
+        manifest['facetFormat'] = FACET_FORMAT
+
+        publish(self.manifest_path, dump_compact(manifest))
+        if rebuild and os.path.exists(os.path.join(self.out_dir, '.facets.json')):
+            os.unlink(os.path.join(self.out_dir, '.facets.json'))  # State of the first index format
+        if self.legacy_file:
+            publish(os.path.join(self.public_dir, self.legacy_file), dump_compact(self.newest(self.legacy_limit)))
+
+        # Fingerprints go last: if a crash skips this, the next run merges the
+        # same items again and the page rewrites above drop the repeats
+        if len(seen) + len(fresh) > 2 * (self.seen_pages + 1) * self.page_size:
+            self._rotate_seen(manifest)
+        else:
+            os.makedirs(self.out_dir, exist_ok=True)
+            with open(self.seen_path, 'a', encoding='utf-8') as f:
+                f.write(''.join(fingerprint + '\n' for fingerprint in fresh))
+        return manifest['total'] - total
+
+    def _rotate_seen(self, manifest: Dict):
+        """Rewrite .seen with the fingerprints of the head and newest seen_pages sealed pages"""
+        fingerprints = [self._fingerprint(item)
+                        for page in manifest['pages'][:self.seen_pages + 1]
+                        for item in self.load_page(page['file'])]
+        atomic_write(self.seen_path, ''.join(fingerprint + '\n' for fingerprint in fingerprints).encode('utf-8'))
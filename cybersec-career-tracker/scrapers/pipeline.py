@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""Streaming stage pipeline connected by bounded queues"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from metrics import ERRORS, STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class Stage:
+    """One pipeline step run by `workers` threads.
+
+    fn takes one item and returns an iterable of output items (empty to drop
+    the item, several to fan out), so fetch -> entries fan-out and dedupe
+    drops use the same shape. source names the source an input item came
+    from, for the error metrics.
+    """
+
+    def __init__(self, name: str, fn: Callable[[object], Iterable], workers: int = 1,
+                 source: Optional[Callable[[object], str]] = None):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.source = source
+        self.processed = 0
+        self.emitted = 0
+        self.errors = 0
+        self.busy_time = 0.0
+
+
+class BatchSink:
+    """Final stage that hands items to write_batch in batches.
+
+    A batch is flushed when it reaches batch_size or when no new item has
+    arrived for max_wait seconds, so the first articles are written long
+    before the slowest source finishes. A batch whose write raised is not
+    counted as written; it is handed to on_error instead.
+    """
+
+    def __init__(self, write_batch: Callable[[List], None], batch_size: int = 50, max_wait: float = 2.0,
+                 on_error: Optional[Callable[[List, Exception], None]] = None):
+        self.write_batch = write_batch
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait
+        self.on_error = on_error
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.first_write_at: Optional[float] = None
+
+    def _flush(self, batch: List):
+        if not batch:
+            return
+        try:
+            self.write_batch(batch)
+        except Exception as e:
+            logger.error(f"Write of {len(batch)} items failed: {e}")
+            self.failed += len(batch)
+            if self.on_error is not None:
+                self.on_error(batch, e)
+            return
+        self.batches += 1
+        self.written += len(batch)
+        if self.first_write_at is None:
+            self.first_write_at = time.time()
+
+    def consume(self, inbox: queue.Queue):
+        batch: List = []
+        while True:
+            try:
+                item = inbox.get(timeout=self.max_wait if batch else None)
+            except queue.Empty:
+                self._flush(batch)
+                batch = []
+                continue
+            if item is _DONE:
+                self._flush(batch)
+                return
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+
+
+class Pipeline:
+    """Runs items through stages concurrently with backpressure.
+
+    Every stage reads from a bounded queue, so a slow stage blocks its
+    upstream instead of letting work (and memory) pile up.
+    """
+
+    def __init__(self, stages: List[Stage], sink: BatchSink, queue_size: int = 100):
+        self.stages = stages
+        self.sink = sink
+        self.queue_size = queue_size
+
+    def _worker(self, stage: Stage, inbox: queue.Queue, outbox: queue.Queue, lock: threading.Lock):
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                return
+            started = time.time()
+            try:
+                outputs = list(stage.fn(item))
+            except Exception as e:
+                logger.error(f"Stage {stage.name} failed on an item: {e}")
+                outputs = []
+                ERRORS.inc(source=stage.source(item) if stage.source else '', stage=stage.name)
+                with lock:
+                    stage.errors += 1
+            STAGE_SECONDS.observe(time.time() - started, stage=stage.name)
+            with lock:
+                stage.processed += 1
+                stage.emitted += len(outputs)
+                stage.busy_time += time.time() - started
+            for output in outputs:
+                outbox.put(output)
+
+    def run(self, items: Iterable) -> Dict:
+        """Push items through every stage and block until all writes finish"""
+        started = time.time()
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        lock = threading.Lock()
+
+        groups: List[List[threading.Thread]] = []
+        for index, stage in enumerate(self.stages):
+            threads = [
+                threading.Thread(target=self._worker, args=(stage, queues[index], queues[index + 1], lock),
+                                 name=f"{stage.name}-{n}", daemon=True)
+                for n in range(stage.workers)
+            ]
+            for thread in threads:
+                thread.start()
+            groups.append(threads)
+
+        sink_thread = threading.Thread(target=self.sink.consume, args=(queues[-1],), name='write', daemon=True)
+        sink_thread.start()
+
+        for item in items:
+            queues[0].put(item)
+
+        # Shut stages down in order: once a stage's workers exit, nothing more
+        # can reach the next queue, so its workers can be told to stop.
+        for index, threads in enumerate(groups):
+            for _ in threads:
+                queues[index].put(_DONE)
+            for thread in threads:
+                thread.join()
+        queues[-1].put(_DONE)
+        sink_thread.join()
+
+        return {
+            'elapsed': time.time() - started,
+            'first_write': (self.sink.first_write_at - started) if self.sink.first_write_at else None,
+            'written': self.sink.written,
+            'failed': self.sink.failed,
+            'batches': self.sink.batches,
+            'stages': {stage.name: {'workers': stage.workers, 'in': stage.processed, 'out': stage.emitted,
+                                    'errors': stage.errors, 'busy': round(stage.busy_time, 3)}
+                       for stage in self.stages},
+        }
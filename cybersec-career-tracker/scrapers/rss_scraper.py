@@ -4,14 +4,21 @@ CyberTrack RSS News Scraper
 Fetches real cybersecurity news from multiple RSS feeds and populates Firebase
 """
 
-import feedparser
-import requests
-import json
-from datetime import datetime, timedelta
+import os
+from datetime import datetime
 import time
-import re
 import hashlib
-from urllib.parse import urlparse
+import heapq
+from fetcher import FetchEngine
+from http_client import reset_retry_budget
+from feed_cache import default_store
+from matcher import INDUSTRY_KEYWORDS, INDUSTRY_MATCHER
+from metrics import ENTRIES_PARSED, write_metrics
+from sources.registry import sources_for
+from timeline import entry_timestamp, to_iso
+from categorizer import DEFAULT_CATEGORY, DEFAULT_SEVERITY, Categorizer
+from trending import TrendTracker
+from storage import WRITE_BEHIND_FLUSH_TIMEOUT, RestSink, WriteBehindLog
 
 # Firebase configuration
 FIREBASE_CONFIG = {
@@ -19,47 +26,28 @@ FIREBASE_CONFIG = {
     'projectId': 'cybersecurity-85e86',
 }
 
-FIRESTORE_URL = f"https://firestore.googleapis.com/v1/projects/{FIREBASE_CONFIG['projectId']}/databases/(default)/documents"
-
-# RSS Feed Sources
-RSS_FEEDS = [
-    {'name': 'The Hacker News', 'url': 'https://feeds.feedburner.com/TheHackersNews', 'category': 'News', 'severity': 'High'},
-    {'name': 'Dark Reading', 'url': 'https://www.darkreading.com/rss.xml', 'category': 'Threat Intelligence', 'severity': 'High'},
-    {'name': 'Krebs on Security', 'url': 'https://krebsonsecurity.com/feed/', 'category': 'Incident Report', 'severity': 'High'},
-    {'name': 'GBHackers', 'url': 'https://gbhackers.com/feed/', 'category': 'News', 'severity': 'Medium'},
-    {'name': 'CSO Online', 'url': 'https://www.csoonline.com/feed/', 'category': 'News', 'severity': 'Medium'},
-    {'name': 'Threatpost', 'url': 'https://threatpost.com/feed/', 'category': 'Malware Analysis', 'severity': 'High'},
-    {'name': 'HackRead', 'url': 'https://hackread.com/feed/', 'category': 'News', 'severity': 'Medium'},
-    {'name': 'Graham Cluley', 'url': 'https://grahamcluley.com/feed/', 'category': 'News', 'severity': 'Low'},
-    {'name': 'The Cyber Post', 'url': 'https://thecyberpost.com/feed/', 'category': 'Incident Report', 'severity': 'High'},
-]
-
-# Industry keywords
-INDUSTRY_KEYWORDS = {
-    'Healthcare': ['hospital', 'health', 'medical', 'patient', 'healthcare'],
-    'Finance': ['bank', 'financial', 'payment', 'credit', 'fintech', 'crypto'],
-    'Government': ['government', 'federal', 'military', 'defense', 'agency'],
-    'Education': ['university', 'school', 'education', 'student', 'college'],
-    'Retail': ['retail', 'store', 'shopping', 'ecommerce'],
-    'Technology': ['software', 'tech', 'cloud', 'saas', 'microsoft', 'google']
-}
+FIRESTORE_URL = os.getenv(
+    'FIRESTORE_REST_URL',
+    f"https://firestore.googleapis.com/v1/projects/{FIREBASE_CONFIG['projectId']}/databases/(default)/documents"
+)
+
+# RSS Feed Sources (see sources/registry.py)
+RSS_SOURCES = sources_for('rss')
+
+def detect_industries(text):
+    """Detect every industry mentioned in article text"""
+    return INDUSTRY_MATCHER.scan(text).labels or ['Technology']
 
 def detect_industry(text):
     """Detect industry from article text"""
-    text_lower = text.lower()
-    for industry, keywords in INDUSTRY_KEYWORDS.items():
-        if any(keyword in text_lower for keyword in keywords):
-            return industry
-    return 'Technology'
+    return detect_industries(text)[0]
 
 def extract_cve(text):
     """Extract CVE IDs from text"""
-    cve_pattern = r'CVE-\d{4}-\d{4,7}'
-    cves = re.findall(cve_pattern, text, re.IGNORECASE)
-    return list(set(cves))[:3]  # Max 3 CVEs
+    return INDUSTRY_MATCHER.scan(text).cves[:3]  # Max 3 CVEs
 
 def generate_article_id(url):
-    """Generate unique ID from URL"""
+    """Generate unique ID from URL (the Firestore document ID, see storage.RestSink)"""
     return hashlib.md5(url.encode()).hexdigest()[:20]
 
 def convert_to_firestore_format(data):
@@ -67,10 +55,12 @@ def convert_to_firestore_format(data):
     def convert_value(value):
         if isinstance(value, str):
             return {'stringValue': value}
+        elif isinstance(value, bool):  # Before int: bool is an int subclass
+            return {'booleanValue': value}
         elif isinstance(value, int):
             return {'integerValue': str(value)}
-        elif isinstance(value, bool):
-            return {'booleanValue': value}
+        elif isinstance(value, float):
+            return {'doubleValue': value}
         elif isinstance(value, list):
             return {'arrayValue': {'values': [convert_value(v) for v in value]}}
         elif isinstance(value, dict):
@@ -80,49 +70,58 @@ def convert_to_firestore_format(data):
 
     return {'fields': {k: convert_value(v) for k, v in data.items()}}
 
-def fetch_rss_feed(feed_info):
+def build_article(title, link, summary, published, source_name, source_website,
+                  category='News', severity='Medium'):
+    """Build the stored article for one feed entry (industries and CVEs from one scan)"""
+    summary = summary[:500]
+    matches = INDUSTRY_MATCHER.scan(f"{title}\n{summary}")
+    industries = matches.labels or ['Technology']
+    industry = industries[0]
+
+    return {
+        'title': title,
+        'url': link,
+        'sourceName': source_name,
+        'sourceWebsite': source_website,
+        'publishedDate': to_iso(published),
+        'summary': summary,
+        'excerpt': summary[:200] + '...' if len(summary) > 200 else summary,
+        'primaryCategory': category,
+        'severity': severity,
+        'industry': industry,
+        'affectedIndustries': industries,
+        'cveIds': matches.cves[:3],
+        'tags': [category.lower(), industry.lower()],
+        'views': 0,
+        'createdAt': datetime.now().isoformat(),
+        'articleId': generate_article_id(link)
+    }
+
+def fetch_rss_feed(source):
     """Fetch and parse RSS feed"""
-    print(f"📡 Fetching {feed_info['name']}...")
+    print(f"📡 Fetching {source.source_name}...")
     try:
-        feed = feedparser.parse(feed_info['url'])
-        articles = []
+        feed = source.fetch()
+        if feed is None:
+            print(f"  ⏭️ {source.source_name} unchanged since last run (or paused)")
+            return []
 
-        for entry in feed.entries[:5]:  # Get latest 5 articles per feed
-            # Parse published date
-            pub_date = datetime.now()
-            if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                pub_date = datetime(*entry.published_parsed[:6])
-
-            # Extract content
-            summary = entry.get('summary', entry.get('description', ''))[:500]
-            title = entry.get('title', 'No Title')
-            link = entry.get('link', '')
-
-            # Detect industry and CVEs
-            full_text = f"{title} {summary}"
-            industry = detect_industry(full_text)
-            cves = extract_cve(full_text)
-
-            article = {
-                'title': title,
-                'url': link,
-                'sourceName': feed_info['name'],
-                'sourceWebsite': feed_info['url'],
-                'publishedDate': pub_date.isoformat(),
-                'summary': summary,
-                'excerpt': summary[:200] + '...' if len(summary) > 200 else summary,
-                'primaryCategory': feed_info['category'],
-                'severity': feed_info['severity'],
-                'industry': industry,
-                'cveIds': cves,
-                'tags': [feed_info['category'].lower(), industry.lower()],
-                'views': 0,
-                'trending': feed_info['severity'] in ['Critical', 'High'],
-                'createdAt': datetime.now().isoformat(),
-                'articleId': generate_article_id(link)
-            }
-
-            articles.append(article)
+        articles = []
+        fetched_at = time.time()
+        dated = [(entry_timestamp(entry) or fetched_at, entry) for entry in feed.entries]
+
+        for published, entry in heapq.nlargest(5, dated, key=lambda pair: pair[0]):  # Latest 5 articles per feed
+            articles.append(build_article(
+                title=entry.get('title', 'No Title'),
+                link=entry.get('link', ''),
+                summary=entry.get('summary', entry.get('description', '')),
+                published=published,
+                source_name=source.source_name,
+                source_website=source.rss_url,
+                category=source.category,
+                severity=source.severity,
+            ))
+            ENTRIES_PARSED.inc(source=source.source_name)
 
         print(f"  ✅ Found {len(articles)} articles")
         return articles
@@ -131,30 +130,34 @@ def fetch_rss_feed(feed_info):
         print(f"  ❌ Error: {e}")
         return []
 
-def upload_to_firebase(articles):
-    """Upload articles to Firebase using REST API"""
-    print(f"\n📤 Uploading {len(articles)} articles to Firebase...")
-
-    uploaded = 0
-    for article in articles:
-        try:
-            doc_id = article['articleId']
-            url = f"{FIRESTORE_URL}/newsArticles/{doc_id}?key={FIREBASE_CONFIG['apiKey']}"
-
-            firestore_data = convert_to_firestore_format(article)
-
-            response = requests.patch(url, json=firestore_data)
-
-            if response.status_code in [200, 201]:
-                uploaded += 1
-                print(f"  ✅ {article['title'][:60]}...")
-            else:
-                print(f"  ❌ Failed: {response.status_code}")
-
-        except Exception as e:
-            print(f"  ❌ Error uploading: {e}")
-
-    return uploaded
+def categorize_articles(articles):
+    """Replace the per-feed category/severity defaults with classified values"""
+    if not articles:
+        return
+    feed_defaults = [(article['primaryCategory'], article['severity']) for article in articles]
+    categorizer = Categorizer()
+    try:
+        categorizer.categorize_many(articles)
+    finally:
+        categorizer.close()
+
+    for article, (feed_category, feed_severity) in zip(articles, feed_defaults):
+        # Nothing specific found; fall back to the feed's defaults
+        if article['primaryCategory'] == DEFAULT_CATEGORY:
+            article['primaryCategory'] = feed_category
+        if article['severity'] == DEFAULT_SEVERITY:
+            article['severity'] = feed_severity
+        article['tags'] = [article['primaryCategory'].lower(), article['industry'].lower()]
+    print(f"🏷️ Categorized {len(articles)} articles ({categorizer.engine})")
+
+def update_trending(tracker, log):
+    """Queue trending-field patches for stored articles whose score changed"""
+    updates = tracker.pending_updates()
+    if not updates:
+        return 0
+    print(f"\n📈 Updating trending scores of {len(updates)} stored articles...")
+    # The log marks them written in the tracker once Firestore confirms them
+    return log.append_updates(updates)
 
 
 def main():
@@ -162,24 +165,42 @@ def main():
     print("=" * 60)
     print("  CyberTrack RSS News Scraper")
     print("=" * 60)
-    print(f"📰 Scraping from {len(RSS_FEEDS)} sources...\n")
+    print(f"📰 Scraping from {len(RSS_SOURCES)} sources...\n")
 
-    all_articles = []
+    # Fetch all feeds concurrently; the per-host limit keeps us polite
+    reset_retry_budget()
+    engine = FetchEngine()
+    results = engine.map(fetch_rss_feed, RSS_SOURCES, url_of=lambda source: source.rss_url, default=[])
 
-    for feed in RSS_FEEDS:
-        articles = fetch_rss_feed(feed)
+    all_articles = []
+    for articles in results:
         all_articles.extend(articles)
-        time.sleep(1)  # Be nice to servers
 
     print(f"\n📊 Total articles collected: {len(all_articles)}")
+    categorize_articles(all_articles)
 
-    if all_articles:
-        uploaded = upload_to_firebase(all_articles)
-        print(f"\n✅ Successfully uploaded {uploaded}/{len(all_articles)} articles!")
-        print(f"🔥 Firebase Project: {FIREBASE_CONFIG['projectId']}")
-        print(f"🌐 View at: http://localhost:5173/app/news")
-    else:
-        print("\n❌ No articles collected")
+    # Uploads run in the background; anything a crash leaves behind is replayed next run
+    tracker = TrendTracker()
+    log = WriteBehindLog(RestSink(), on_updated=tracker.mark_written)
+    try:
+        tracker.observe_many(all_articles)
+        if all_articles:
+            print(f"\n📤 Uploading {log.append(all_articles)} articles to Firebase...")
+            log.flush(WRITE_BEHIND_FLUSH_TIMEOUT)
+            print(f"\n✅ Successfully uploaded {log.written}/{len(all_articles)} articles!")
+            print(f"🔥 Firebase Project: {FIREBASE_CONFIG['projectId']}")
+            print(f"🌐 View at: http://localhost:5173/app/news")
+        else:
+            print("\n⏭️ No new articles (feeds unchanged or unreachable)")
+        update_trending(tracker, log)
+    finally:
+        if not log.close():
+            print(f"⚠️ {log.pending} writes left in {log.path} for the next run")
+        tracker.close()
+
+    # Only remember validators once the run is done
+    default_store().save()
+    write_metrics()
 
     print("\n" + "=" * 60)
 
@@ -7,6 +7,7 @@ import os
 import sys
 from datetime import datetime, timedelta
 import random
+import logging
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -20,6 +21,8 @@ except ImportError:
     print("  Run: pip install firebase-admin")
     sys.exit(1)
 
+from firestore_writer import bulk_save
+
 def initialize_firebase():
     """Initialize Firebase"""
     try:
@@ -141,28 +144,17 @@ def add_sample_news(db):
         }
     ]
     
-    saved_count = 0
-    for article in sample_articles:
-        try:
-            # Check if article already exists
-            existing = db.collection('newsArticles').where('url', '==', article['url']).limit(1).get()
-            
-            if len(list(existing)) > 0:
-                print(f"  ⊘ Skipped (exists): {article['title'][:60]}...")
-                continue
-            
-            # Add metadata
-            article['scrapedAt'] = firestore.SERVER_TIMESTAMP
-            
-            # Save to Firestore
-            db.collection('newsArticles').add(article)
-            saved_count += 1
-            print(f"  ✓ Saved: {article['title'][:60]}...")
-            
-        except Exception as e:
-            print(f"  ✗ Error saving article: {e}")
-            continue
+    def add_metadata(article):
+        article['scrapedAt'] = firestore.SERVER_TIMESTAMP
     
+    try:
+        saved_ids, skipped = bulk_save(db, sample_articles, prepare=add_metadata)
+    except Exception as e:
+        print(f"  ✗ Error saving articles: {e}")
+        return
+    
+    saved_count = len(saved_ids)
+    print(f"  ⊘ Skipped {skipped} articles that already exist")
     print(f"\n✓ Added {saved_count} sample articles to Firebase")
 
 def main():
@@ -170,6 +162,9 @@ def main():
     print("CyberTrack News Scraper - Quick Setup")
     print("=" * 80)
     
+    # Show per-batch write timing from firestore_writer
+    logging.basicConfig(level=logging.INFO, format='  %(message)s')
+    
     # Initialize Firebase
     db = initialize_firebase()
     
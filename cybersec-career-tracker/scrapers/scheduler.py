@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Adaptive per-source polling for daemon mode"""
+
+import heapq
+import logging
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class PollState:
+    """Polling interval and health of one source"""
+
+    def __init__(self, name: str, job: Callable[[], int], interval: float):
+        self.name = name
+        self.job = job
+        self.interval = interval
+        self.failures = 0
+        self.runs = 0
+        self.last_new = 0
+
+
+class AdaptiveScheduler:
+    """Runs each source on its own interval, adapted to how often it publishes.
+
+    A poll that finds new items halves the interval (down to min_interval),
+    a quiet poll stretches it by 1.5x (up to max_interval), and a failing
+    source backs off exponentially. Due times live in a heap, so the loop
+    sleeps until exactly the next source is due.
+    """
+
+    def __init__(self, min_interval: float = 120, max_interval: float = 3600,
+                 initial_interval: float = 600):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.initial_interval = min(max(initial_interval, min_interval), max_interval)
+        self._sources: Dict[str, PollState] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._stop = threading.Event()
+
+    def add(self, name: str, job: Callable[[], int]):
+        """Register a source; job() returns how many new items it found"""
+        self._sources[name] = PollState(name, job, self.initial_interval)
+        heapq.heappush(self._heap, (time.time(), name))
+
+    def _clamp(self, interval: float) -> float:
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def next_interval(self, state: PollState, new_items: Optional[int]) -> float:
+        """Interval after a poll that found new_items (None when it failed)"""
+        if new_items is None:
+            state.failures += 1
+            # Back off from the current interval without letting it shrink
+            return self._clamp(max(state.interval, self.min_interval) * (2 ** min(state.failures, 6)))
+        state.failures = 0
+        if new_items > 0:
+            return self._clamp(state.interval / 2)
+        return self._clamp(state.interval * 1.5)
+
+    def run_once(self, name: str) -> Optional[int]:
+        """Poll one source now and reschedule it"""
+        state = self._sources[name]
+        new_items: Optional[int] = None
+        try:
+            new_items = state.job()
+        except Exception as e:
+            logger.error(f"Polling {name} failed: {e}")
+
+        state.runs += 1
+        state.last_new = new_items or 0
+        interval = self.next_interval(state, new_items)
+        if new_items is not None:
+            state.interval = interval
+        # Jitter keeps sources from drifting into lockstep
+        delay = interval * random.uniform(0.9, 1.1)
+        heapq.heappush(self._heap, (time.time() + delay, name))
+        logger.info(f"{name}: {state.last_new} new, next poll in {delay:.0f}s")
+        return new_items
+
+    def run_forever(self):
+        """Poll sources as they come due until stop() is called"""
+        while self._heap and not self._stop.is_set():
+            due, name = heapq.heappop(self._heap)
+            wait = due - time.time()
+            if wait > 0 and self._stop.wait(wait):
+                break
+            self.run_once(name)
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Durable local index of article IDs already stored in Firestore"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, Set
+
+from metrics import firestore_rpc
+
+SEEN_INDEX_PATH = os.getenv('SEEN_INDEX_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.seen_index.sqlite3'))
+
+# SQLite's default limit on bound parameters per statement is 999
+_CHUNK = 500
+
+
+class SeenIndex:
+    """SQLite-backed set of known article IDs.
+
+    The index is warmed from Firestore once (warm()), then kept in sync by
+    add_many() after every write, so duplicate checks are local lookups
+    instead of document reads.
+    """
+
+    def __init__(self, path: str = SEEN_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS seen (id TEXT PRIMARY KEY) WITHOUT ROWID')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM seen').fetchone()[0]
+
+    def is_warm(self) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'warmed_at'").fetchone()
+        return row is not None
+
+    def warm(self, db, collection: str = 'newsArticles', force: bool = False) -> int:
+        """Load every stored document ID from Firestore (only once unless forced)"""
+        if self.is_warm() and not force:
+            return 0
+        # select([]) streams document references without their fields
+        with firestore_rpc('stream_ids'):
+            ids = (doc.id for doc in db.collection(collection).select([]).stream())
+            added = self.add_many(ids)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('warmed_at', ?)", (str(time.time()),))
+            self._conn.commit()
+        return added
+
+    def contains(self, article_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute('SELECT 1 FROM seen WHERE id = ?', (article_id,)).fetchone() is not None
+
+    def contains_many(self, article_ids: Iterable[str]) -> Set[str]:
+        """Return the subset of article_ids present in the index"""
+        article_ids = list(article_ids)
+        found: Set[str] = set()
+        with self._lock:
+            for start in range(0, len(article_ids), _CHUNK):
+                chunk = article_ids[start:start + _CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(f'SELECT id FROM seen WHERE id IN ({placeholders})', chunk)
+                found.update(row[0] for row in rows)
+        return found
+
+    def add_many(self, article_ids: Iterable[str]) -> int:
+        """Record article IDs as stored; returns how many were new"""
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany('INSERT OR IGNORE INTO seen (id) VALUES (?)', ((i,) for i in article_ids))
+            self._conn.commit()
+            return self._conn.total_changes - before
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""Base class for feed-backed news sources"""
+
+import copy
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence
+
+from circuit_breaker import CircuitBreaker
+from feed_cache import state_key
+from fetcher import fetch_feed, host_of
+from matcher import INDUSTRY_MATCHER
+from metrics import SOURCES_SKIPPED
+from timeline import entry_timestamp, to_datetime
+
+logger = logging.getLogger(__name__)
+
+# Feed request timeout for sources that do not set their own
+SOURCE_TIMEOUT = float(os.getenv('SOURCE_TIMEOUT', '10'))
+
+
+class FeedSource:
+    """A news source backed by one RSS/Atom feed.
+
+    The orchestrator drives sources through fetch_entries() -> parse_entry()
+    -> enrich(); the RSS scripts only need fetch(). Subclasses override
+    parse_entry()/enrich() to pull more out of the article pages.
+
+    used_by names the entry points that read this source: 'orchestrator'
+    (main.py), 'rss' (rss_scraper.py) and 'static' (fetch_real_news.py).
+    """
+
+    max_entries = 20
+    consumer: Optional[str] = None  # Entry point this copy belongs to (see for_consumer)
+
+    def __init__(self, name: str, url: str, category: str = 'News', severity: str = 'Medium',
+                 website: Optional[str] = None, logo: str = '', timeout: float = SOURCE_TIMEOUT,
+                 used_by: Sequence[str] = ('rss', 'static'), enabled: bool = True):
+        self.source_name = name
+        self.rss_url = url
+        self.category = category
+        self.severity = severity
+        self.base_url = website or f"https://{host_of(url)}"
+        self.logo_url = logo
+        self.timeout = timeout
+        self.used_by = frozenset(used_by)
+        self.enabled = enabled
+        self.breaker = CircuitBreaker(url)
+        self.last_error = None  # Set when the last fetch failed outright
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.source_name!r})"
+
+    def for_consumer(self, consumer: str) -> 'FeedSource':
+        """Copy of this source whose feed state and circuit breaker are kept
+        apart for one entry point (failures seen by one never pause another)"""
+        bound = copy.copy(self)
+        bound.consumer = consumer
+        bound.breaker = CircuitBreaker(state_key(self.rss_url, consumer))
+        return bound
+
+    def available(self) -> bool:
+        """False while the source is disabled or its circuit is open"""
+        return self.enabled and self.breaker.allow()
+
+    def fetch(self):
+        """Fetch the feed within this source's timeout.
+
+        Returns None when the feed is unchanged or the circuit is open, so a
+        dead source costs nothing until its cooldown ends.
+        """
+        if not self.available():
+            SOURCES_SKIPPED.inc(source=self.source_name)
+            logger.info(f"{self.source_name} paused after {self.breaker.failures} failures, skipping")
+            return None
+        try:
+            feed = fetch_feed(self.rss_url, source=self.source_name, timeout=self.timeout,
+                              consumer=self.consumer)
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return feed
+
+    def fetch_entries(self, seen_filter: Optional[Callable[[List[str]], List[str]]] = None) -> List:
+        """Download the feed and return the new entries worth scraping"""
+        feed = self.fetch()
+        if feed is None:
+            logger.info(f"{self.source_name} feed unchanged, skipping")
+            return []
+
+        entries = feed.entries[:self.max_entries]
+        if seen_filter is not None:
+            new_links = set(seen_filter([entry.link for entry in entries]))
+            logger.info(f"{self.source_name}: {len(new_links)}/{len(entries)} entries are new")
+            entries = [entry for entry in entries if entry.link in new_links]
+        return entries
+
+    def parse_entry(self, entry) -> Dict:
+        """Build an article from the feed entry alone"""
+        return self._build_article(entry)
+
+    def enrich_deadline(self) -> Optional[float]:
+        """Time after which enrich() stops downloading pages for one fetch (None: no pages)"""
+        return None
+
+    def enrich(self, article: Dict, deadline: Optional[float] = None) -> Dict:
+        return self._tag_entities(article)
+
+    def scrape(self, seen_filter: Optional[Callable[[List[str]], List[str]]] = None) -> List[Dict]:
+        """Fetch, parse and enrich every new entry in one call"""
+        self.last_error = None
+        try:
+            entries = self.fetch_entries(seen_filter)
+        except Exception as e:
+            logger.error(f"Error scraping {self.source_name}: {e}")
+            self.last_error = e
+            return []
+
+        articles = []
+        deadline = self.enrich_deadline()
+        for entry in entries:
+            try:
+                articles.append(self.enrich(self.parse_entry(entry), deadline))
+            except Exception as e:
+                logger.error(f"Error parsing entry: {e}")
+        return articles
+
+    def _build_article(self, entry, full_content: str = '', image_url: str = '') -> Dict:
+        summary = entry.get('summary', '')
+        return {
+            'title': entry.title,
+            'url': entry.link,
+            'sourceWebsite': self.base_url,
+            'sourceName': self.source_name,
+            'sourceLogo': self.logo_url,
+            'author': entry.get('author', f"{self.source_name} Staff"),
+            'publishedDate': self._published(entry),
+            'summary': summary,
+            'excerpt': summary[:200] + '...' if len(summary) > 200 else summary,
+            'fullContent': full_content,
+            'imageUrl': image_url,
+            'tags': [tag.term for tag in entry.get('tags', [])],
+        }
+
+    def _published(self, entry) -> datetime:
+        timestamp = entry_timestamp(entry)
+        if timestamp is None:
+            logger.warning(f"{self.source_name}: no usable date on {entry.get('link')}, using fetch time")
+            return datetime.now(timezone.utc)
+        return to_datetime(timestamp)
+
+    def _tag_entities(self, article: Dict) -> Dict:
+        """Add CVE IDs and industries found anywhere in the article"""
+        matches = INDUSTRY_MATCHER.scan(f"{article['title']}\n{article['summary']}\n{article['fullContent']}")
+        article['cveIds'] = matches.cves
+        article['affectedIndustries'] = matches.labels
+        return article
@@ -1,33 +1,60 @@
 #!/usr/bin/env python3
 """BleepingComputer RSS Scraper"""
 
-import feedparser
-import requests
-from bs4 import BeautifulSoup
-from datetime import datetime
-from typing import List, Dict
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, List, Dict, Optional, Tuple
 import logging
+from extractor import fetch_article, rule_for
+from http_client import get_session
+from sources.base import FeedSource
+from metrics import ERRORS, FETCH_BYTES, FETCH_SECONDS
 
 logger = logging.getLogger(__name__)
 
-class BleepingComputerScraper:
+# Article page fetching limits
+ARTICLE_WORKERS = int(os.getenv('ARTICLE_WORKERS', '6'))
+ARTICLE_TIMEOUT = float(os.getenv('ARTICLE_TIMEOUT', '10'))
+ARTICLE_DEADLINE = float(os.getenv('ARTICLE_DEADLINE', '30'))
+
+class BleepingComputerScraper(FeedSource):
     def __init__(self):
-        self.source_name = "BleepingComputer"
-        self.rss_url = "https://www.bleepingcomputer.com/feed/"
-        self.base_url = "https://www.bleepingcomputer.com"
-        self.logo_url = "https://www.bleepingcomputer.com/images/bleeping-logo.png"
+        super().__init__(
+            "BleepingComputer", "https://www.bleepingcomputer.com/feed/",
+            website="https://www.bleepingcomputer.com",
+            logo="https://www.bleepingcomputer.com/images/bleeping-logo.png",
+            used_by=('orchestrator',),
+        )
+        self._session = None  # Created on first article download
+        self.site_rule = rule_for(self.base_url)  # div.articleBody + og:image
+    
+    @property
+    def session(self):
+        if self._session is None:
+            self._session = get_session(ARTICLE_WORKERS)
+        return self._session
+    
+    @session.setter
+    def session(self, session):
+        self._session = session
     
-    def scrape(self) -> List[Dict]:
-        """Scrape articles from BleepingComputer"""
+    def scrape(self, seen_filter: Optional[Callable[[List[str]], List[str]]] = None) -> List[Dict]:
+        """Scrape articles from BleepingComputer.
+        
+        seen_filter receives the entry links and returns the ones not stored
+        yet, so article pages are only downloaded for new entries.
+        """
         articles = []
+        self.last_error = None
         
         try:
-            # Parse RSS feed
-            feed = feedparser.parse(self.rss_url)
+            entries = self.fetch_entries(seen_filter)
+            full_articles = self._scrape_full_articles([entry.link for entry in entries])
             
-            for entry in feed.entries[:20]:  # Limit to 20 most recent
+            for entry in entries:
                 try:
-                    article = self._parse_entry(entry)
+                    article = self._parse_entry(entry, full_articles.get(entry.link, ('', '')))
                     if article:
                         articles.append(article)
                 except Exception as e:
@@ -35,55 +62,78 @@ class BleepingComputerScraper:
             
         except Exception as e:
             logger.error(f"Error scraping BleepingComputer: {e}")
+            self.last_error = e
         
         return articles
     
-    def _parse_entry(self, entry) -> Dict:
+    def parse_entry(self, entry) -> Dict:
+        """Build an article from the RSS entry alone (no page download)"""
+        return self._parse_entry(entry, ('', ''))
+    
+    def enrich_deadline(self) -> Optional[float]:
+        return time.time() + ARTICLE_DEADLINE
+    
+    def enrich(self, article: Dict, deadline: Optional[float] = None) -> Dict:
+        """Fill in fullContent and imageUrl from the article page.
+        
+        Past the deadline the page is given up on and the article keeps its
+        feed summary, the same as pages that miss the bulk scrape deadline.
+        """
+        timeout = ARTICLE_TIMEOUT
+        if deadline is not None:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                logger.warning(f"{self.source_name}: {article['url']} missed the {ARTICLE_DEADLINE:.0f}s deadline")
+                return self._tag_entities(article)
+            timeout = min(timeout, remaining)
+        article['fullContent'], article['imageUrl'] = self._scrape_full_article(article['url'], timeout)
+        return self._tag_entities(article)
+    
+    def _parse_entry(self, entry, full_article: Optional[Tuple[str, str]] = None) -> Dict:
         """Parse individual RSS entry"""
-        # Get full article content
-        full_content, image_url = self._scrape_full_article(entry.link)
+        # Get full article content (unless it was fetched in bulk already)
+        if full_article is None:
+            full_article = self._scrape_full_article(entry.link)
+        full_content, image_url = full_article
         
-        article = {
-            'title': entry.title,
-            'url': entry.link,
-            'sourceWebsite': self.base_url,
-            'sourceName': self.source_name,
-            'sourceLogo': self.logo_url,
-            'author': entry.get('author', 'BleepingComputer Staff'),
-            'publishedDate': self._parse_date(entry.published),
-            'summary': entry.summary,
-            'excerpt': entry.summary[:200] + '...' if len(entry.summary) > 200 else entry.summary,
-            'fullContent': full_content,
-            'imageUrl': image_url,
-            'tags': [tag.term for tag in entry.get('tags', [])],
-        }
+        article = self._build_article(entry, full_content, image_url)
+        article['author'] = entry.get('author', 'BleepingComputer Staff')
+        article['summary'] = entry.summary
+        article['excerpt'] = entry.summary[:200] + '...' if len(entry.summary) > 200 else entry.summary
         
-        return article
+        return self._tag_entities(article)
     
-    def _scrape_full_article(self, url: str) -> tuple:
+    def _scrape_full_articles(self, urls: List[str]) -> Dict[str, Tuple[str, str]]:
+        """Scrape many article pages in parallel within a per-run deadline.
+
+        Pages that have not finished when the deadline passes are given up on
+        and come back empty, so one slow page cannot stall the whole source.
+        """
+        if not urls:
+            return {}
+        
+        started = time.time()
+        pool = ThreadPoolExecutor(max_workers=min(ARTICLE_WORKERS, len(urls)), thread_name_prefix='article')
+        futures = {pool.submit(self._scrape_full_article, url): url for url in urls}
+        done, not_done = wait(futures, timeout=ARTICLE_DEADLINE)
+        pool.shutdown(wait=False, cancel_futures=True)
+        
+        if not_done:
+            logger.warning(f"{self.source_name}: {len(not_done)} article pages missed the {ARTICLE_DEADLINE:.0f}s deadline")
+        logger.info(f"{self.source_name}: fetched {len(done)} article pages in {time.time() - started:.2f}s")
+        
+        return {futures[future]: future.result() for future in done}
+    
+    def _scrape_full_article(self, url: str, timeout: float = ARTICLE_TIMEOUT) -> tuple:
         """Scrape full article content from article page"""
         try:
-            response = requests.get(url, timeout=10)
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Find article content
-            article_body = soup.find('div', class_='articleBody')
-            content = article_body.get_text(strip=True) if article_body else ''
-            
-            # Find featured image
-            image = soup.find('meta', property='og:image')
-            image_url = image['content'] if image else ''
-            
+            # Streams the page and stops once div.articleBody has closed
+            with FETCH_SECONDS.time(source=self.source_name, kind='article'):
+                content, image_url, size = fetch_article(self.session, url, timeout, self.site_rule)
+            FETCH_BYTES.inc(size, source=self.source_name, kind='article')
             return content, image_url
             
         except Exception as e:
+            ERRORS.inc(source=self.source_name, stage='article')
             logger.error(f"Error scraping full article {url}: {e}")
             return '', ''
-    
-    def _parse_date(self, date_string: str) -> datetime:
-        """Parse date string to datetime"""
-        try:
-            return datetime.strptime(date_string, '%a, %d %b %Y %H:%M:%S %z')
-        except:
-            return datetime.now()
-
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Every news source the scrapers know about, in one place"""
+
+from typing import List, Optional
+
+from sources.base import FeedSource
+from sources.bleeping_computer import BleepingComputerScraper
+
+BOTH = ('rss', 'static')
+
+SOURCES: List[FeedSource] = [
+    BleepingComputerScraper(),
+    FeedSource('The Hacker News', 'https://feeds.feedburner.com/TheHackersNews', 'News', 'High', used_by=BOTH),
+    FeedSource('Dark Reading', 'https://www.darkreading.com/rss.xml', 'Threat Intelligence', 'High', used_by=BOTH),
+    FeedSource('Krebs on Security', 'https://krebsonsecurity.com/feed/', 'Incident Report', 'High', used_by=BOTH),
+    FeedSource('GBHackers', 'https://gbhackers.com/feed/', 'News', 'Medium', used_by=BOTH),
+    FeedSource('CSO Online', 'https://www.csoonline.com/feed/', 'News', 'Medium', used_by=BOTH),
+    # Threatpost stopped publishing in 2022; its feed only times out now
+    FeedSource('Threatpost', 'https://threatpost.com/feed/', 'Malware Analysis', 'High', used_by=BOTH, enabled=False),
+    FeedSource('HackRead', 'https://hackread.com/feed/', 'News', 'Medium', used_by=BOTH),
+    FeedSource('Graham Cluley', 'https://grahamcluley.com/feed/', 'News', 'Low', used_by=BOTH),
+    FeedSource('The Cyber Post', 'https://thecyberpost.com/feed/', 'Incident Report', 'High', used_by=BOTH),
+    FeedSource('CISA Alerts', 'https://www.cisa.gov/uscert/ncas/alerts.xml', used_by=('static',)),
+    FeedSource('BankInfoSecurity', 'https://www.bankinfosecurity.com/rss-feeds', used_by=('static',)),
+    FeedSource('Cyber Defense Magazine', 'https://www.cyberdefensemagazine.com/feed/', used_by=('static',)),
+    FeedSource('IT Security Guru', 'https://www.itsecurityguru.org/feed/', used_by=('static',)),
+    FeedSource('TechTarget Security', 'https://searchsecurity.techtarget.com/rss/Security-Wire-Daily-News.xml',
+               used_by=('static',)),
+    FeedSource('CSHub', 'https://www.cshub.com/rss', used_by=('static',)),
+]
+
+
+def register(source: FeedSource):
+    """Add a source plugin (replacing any source with the same name)"""
+    SOURCES[:] = [s for s in SOURCES if s.source_name != source.source_name]
+    SOURCES.append(source)
+
+
+def get_source(name: str) -> Optional[FeedSource]:
+    return next((source for source in SOURCES if source.source_name == name), None)
+
+
+def sources_for(consumer: str, include_disabled: bool = False) -> List[FeedSource]:
+    """Sources read by one entry point ('orchestrator', 'rss' or 'static'),
+    bound to it so their feed state is not shared with the other entry points"""
+    return [source.for_consumer(consumer) for source in SOURCES
+            if consumer in source.used_by and (source.enabled or include_disabled)]
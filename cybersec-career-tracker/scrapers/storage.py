@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""Pluggable article storage and a durable write-behind log in front of it"""
+
+import abc
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from deduplicator import generate_article_id
+from metrics import ARTICLES_WRITTEN, TRENDING_UPDATES, WRITE_BEHIND_FLUSHES
+from seen_index import SEEN_INDEX_PATH
+from trending import TRENDING_STATE_PATH
+
+logger = logging.getLogger(__name__)
+
+SCRAPERS_DIR = os.path.dirname(os.path.abspath(__file__))
+STORAGE_SINKS = ('firestore', 'rest', 'sqlite', 'jsonl')
+SQLITE_PATH = os.getenv('SQLITE_PATH', os.path.join(SCRAPERS_DIR, 'articles.sqlite3'))
+
+WRITE_BEHIND = os.getenv('WRITE_BEHIND', '1') != '0'
+WRITE_BEHIND_DIR = os.getenv('WRITE_BEHIND_DIR', SCRAPERS_DIR)
+WRITE_BEHIND_BATCH = int(os.getenv('WRITE_BEHIND_BATCH', '200'))
+WRITE_BEHIND_INTERVAL = float(os.getenv('WRITE_BEHIND_INTERVAL', '1.0'))
+WRITE_BEHIND_MAX_ATTEMPTS = int(os.getenv('WRITE_BEHIND_MAX_ATTEMPTS', '10'))
+# How long a run waits for the log to drain before exiting (the rest is replayed next time)
+WRITE_BEHIND_FLUSH_TIMEOUT = float(os.getenv('WRITE_BEHIND_FLUSH_TIMEOUT', '120'))
+
+
+def _encode(value):
+    # Tagged so replayed articles get datetimes back, not strings
+    if isinstance(value, (datetime, date)):
+        return {'$datetime': value.isoformat()}
+    return str(value)
+
+
+def _decode(obj: Dict):
+    if len(obj) == 1 and '$datetime' in obj:
+        return datetime.fromisoformat(obj['$datetime'])
+    return obj
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def dumps(value) -> str:
+    return json.dumps(value, default=_encode, ensure_ascii=False)
+
+
+def loads(text: str):
+    return json.loads(text, object_hook=_decode)
+
+
+class StorageSink(abc.ABC):
+    """Where articles end up. Every sink is keyed by generate_article_id(url).
+
+    write() stores articles that are not stored yet and returns (written
+    IDs, skipped); update() patches fields of stored articles and returns
+    the IDs it patched (missing articles are left out). Both may be
+    called again with the same input after a crash, so they must be
+    idempotent. Sinks that keep their own output also keep their own seen
+    index, trending state and write-behind log next to it.
+    """
+
+    name = ''
+    path: Optional[str] = None  # Local output, if any
+    seen_index_path = SEEN_INDEX_PATH
+    trending_state_path = TRENDING_STATE_PATH
+
+    @property
+    def write_log_path(self) -> str:
+        return os.path.join(WRITE_BEHIND_DIR, f'.write_behind.{self.name}.sqlite3')
+
+    @abc.abstractmethod
+    def write(self, articles: List[Dict]) -> Tuple[List[str], int]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def update(self, updates: Dict[str, Dict]) -> List[str]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class FirestoreSink(StorageSink):
+    """Firestore through the Admin SDK (bulk_save / bulk_update)"""
+
+    name = 'firestore'
+
+    def __init__(self, db, collection: str = 'newsArticles'):
+        self.db = db
+        self.collection = collection
+
+    def write(self, articles: List[Dict]) -> Tuple[List[str], int]:
+        from firebase_admin import firestore
+        from firestore_writer import bulk_save
+
+        def add_metadata(article):
+            article['scrapedAt'] = firestore.SERVER_TIMESTAMP
+            article['views'] = 0
+            article.setdefault('trending', False)
+
+        return bulk_save(self.db, articles, self.collection, prepare=add_metadata)
+
+    def update(self, updates: Dict[str, Dict]) -> List[str]:
+        from firestore_writer import bulk_update
+        return bulk_update(self.db, updates, self.collection)
+
+
+class RestSink(StorageSink):
+    """Firestore through REST documents:batchWrite (no service account needed).
+
+    Documents keep the IDs rss_scraper.py always gave them (articleId, the
+    first 20 hex digits of generate_article_id), so re-runs upsert the same
+    documents; write() still returns full article IDs like every sink.
+    """
+
+    name = 'rest'
+
+    def __init__(self, uploader=None):
+        if uploader is None:
+            from firestore_rest import FirestoreRestUploader
+            from rss_scraper import FIREBASE_CONFIG, FIRESTORE_URL
+            uploader = FirestoreRestUploader(FIRESTORE_URL, api_key=FIREBASE_CONFIG['apiKey'])
+        self.uploader = uploader
+
+    @staticmethod
+    def doc_id(article_id: str) -> str:
+        return article_id[:20]
+
+    def write(self, articles: List[Dict]) -> Tuple[List[str], int]:
+        from rss_scraper import convert_to_firestore_format
+
+        by_id: Dict[str, Dict] = {}
+        for article in articles:
+            by_id.setdefault(generate_article_id(article['url']), article)
+        docs = [(article.get('articleId') or self.doc_id(article_id), convert_to_firestore_format(article))
+                for article_id, article in by_id.items()]
+        uploaded = len(self.uploader.upload(docs))
+        if uploaded < len(docs):
+            # Writes are upserts, so sending the whole batch again is safe
+            raise RuntimeError(f"only {uploaded}/{len(docs)} documents were written")
+        return list(by_id), len(articles) - len(by_id)
+
+    def update(self, updates: Dict[str, Dict]) -> List[str]:
+        from rss_scraper import convert_to_firestore_format
+
+        mask = sorted({field for fields in updates.values() for field in fields})
+        article_ids = {self.doc_id(article_id): article_id for article_id in updates}
+        docs = [(doc_id, convert_to_firestore_format(updates[article_id])) for doc_id, article_id in article_ids.items()]
+        # Missing documents fail for good, so a partial result is not retried
+        return [article_ids[doc_id] for doc_id in self.uploader.upload(docs, update_mask=mask)]
+
+
+class SqliteSink(StorageSink):
+    """Articles as JSON rows in a local SQLite file (offline runs, testing)"""
+
+    name = 'sqlite'
+
+    def __init__(self, path: str = SQLITE_PATH):
+        self.path = path
+        base = os.path.splitext(path)[0]
+        self.seen_index_path = base + '.seen.sqlite3'
+        self.trending_state_path = base + '.trending.sqlite3'
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS articles (id TEXT PRIMARY KEY, source TEXT, '
+                           'published TEXT, scraped_at TEXT, data TEXT NOT NULL)')
+        self._conn.commit()
+
+    @property
+    def write_log_path(self) -> str:
+        return os.path.splitext(self.path)[0] + '.pending.sqlite3'
+
+    def write(self, articles: List[Dict]) -> Tuple[List[str], int]:
+        now = datetime.now().isoformat()
+        written = []
+        with self._lock:
+            for article in articles:
+                article_id = generate_article_id(article['url'])
+                record = dict(article, id=article_id, scrapedAt=now, views=0)
+                record.setdefault('trending', False)
+                published = _plain(record['publishedDate']) if record.get('publishedDate') else None
+                cursor = self._conn.execute(
+                    'INSERT OR IGNORE INTO articles (id, source, published, scraped_at, data) VALUES (?, ?, ?, ?, ?)',
+                    (article_id, record.get('sourceName'), published, now,
+                     json.dumps(record, default=_plain, ensure_ascii=False)))
+                if cursor.rowcount:
+                    written.append(article_id)
+            self._conn.commit()
+        return written, len(articles) - len(written)
+
+    def update(self, updates: Dict[str, Dict]) -> List[str]:
+        updated = []
+        with self._lock:
+            for article_id, fields in updates.items():
+                row = self._conn.execute('SELECT data FROM articles WHERE id = ?', (article_id,)).fetchone()
+                if row is None:
+                    continue
+                record = dict(json.loads(row[0]), **fields)
+                self._conn.execute('UPDATE articles SET data = ? WHERE id = ?',
+                                   (json.dumps(record, default=_plain, ensure_ascii=False), article_id))
+                updated.append(article_id)
+            self._conn.commit()
+        return updated
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_sink(name: str, db=None, path: Optional[str] = None) -> StorageSink:
+    """Build a sink by name; path overrides the output file of local sinks"""
+    if name == 'firestore':
+        if db is None:
+            raise ValueError("the firestore sink needs a Firestore client")
+        return FirestoreSink(db)
+    if name == 'rest':
+        return RestSink()
+    if name == 'sqlite':
+        return SqliteSink(path or SQLITE_PATH)
+    if name == 'jsonl':
+        from jsonl_sink import JSONL_PATH, JsonlSink
+        return JsonlSink(path or JSONL_PATH)
+    raise ValueError(f"unknown sink {name!r} (choose from {', '.join(STORAGE_SINKS)})")
+
+
+class WriteBehindLog:
+    """Durable buffer between the scraper and a slow storage sink.
+
+    append() commits articles to a local SQLite log and returns at once; a
+    background thread writes them to the sink in batches, oldest first, and
+    deletes them from the log only once the sink accepted them. Whatever is
+    still in the log when the process dies is replayed on the next start,
+    so delivery is at-least-once (sinks are idempotent by article ID).
+
+    on_written gets the IDs of stored articles and on_updated the updates
+    the sink confirmed, so callers only record what really landed.
+
+    A failing batch is retried with capped exponential backoff. Entries
+    that fail max_attempts times are parked in a dead table instead of
+    blocking everything behind them, and are queued again on the next start.
+    The log is locked to one process; give each instance its own file.
+    """
+
+    def __init__(self, sink: StorageSink, path: Optional[str] = None, batch_size: int = WRITE_BEHIND_BATCH,
+                 interval: float = WRITE_BEHIND_INTERVAL, max_attempts: int = WRITE_BEHIND_MAX_ATTEMPTS,
+                 on_written: Optional[Callable[[List[str]], None]] = None,
+                 on_updated: Optional[Callable[[Dict[str, Dict]], None]] = None):
+        self.sink = sink
+        self.path = path or sink.write_log_path
+        self.batch_size = max(1, batch_size)
+        self.interval = interval
+        self.max_attempts = max(1, max_attempts)
+        self.on_written = on_written
+        self.on_updated = on_updated
+        self.written = 0
+        self.skipped = 0
+        self.parked = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=1, check_same_thread=False)
+        try:
+            self._conn.execute('PRAGMA locking_mode=EXCLUSIVE')
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=FULL')  # Accepted means on disk
+            self._conn.execute('BEGIN EXCLUSIVE')
+        except sqlite3.OperationalError as e:
+            self._conn.close()
+            raise RuntimeError(f"write-behind log {self.path} is in use by another process ({e})") from e
+        self._conn.execute('CREATE TABLE IF NOT EXISTS pending (seq INTEGER PRIMARY KEY AUTOINCREMENT, '
+                           'op TEXT NOT NULL, payload TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0)')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS dead (seq INTEGER PRIMARY KEY, op TEXT NOT NULL, '
+                           'payload TEXT NOT NULL, error TEXT, failed_at REAL)')
+        # Give parked entries another chance; seq keeps their original order
+        revived = self._conn.execute('INSERT INTO pending (seq, op, payload) SELECT seq, op, payload FROM dead').rowcount
+        self._conn.execute('DELETE FROM dead')
+        self._conn.commit()
+        self._pending = self._conn.execute('SELECT COUNT(*) FROM pending').fetchone()[0]
+        if self._pending:
+            logger.info(f"Replaying {self._pending} unflushed writes from {self.path}"
+                        + (f" ({revived} had failed before)" if revived else ''))
+
+        self._cond = threading.Condition()
+        self._waiters = 0
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self) -> int:
+        with self._cond:
+            return self._pending
+
+    def _append(self, rows: List[Tuple[str, str]]) -> int:
+        if not rows:
+            return 0
+        with self._lock:
+            self._conn.executemany('INSERT INTO pending (op, payload) VALUES (?, ?)', rows)
+            self._conn.commit()
+        with self._cond:
+            self._pending += len(rows)
+            if self._pending >= self.batch_size:
+                self._cond.notify_all()
+        return len(rows)
+
+    def append(self, articles: Iterable[Dict]) -> int:
+        """Durably queue articles for writing; returns how many were queued"""
+        return self._append([('write', dumps(article)) for article in articles])
+
+    def append_updates(self, updates: Dict[str, Dict]) -> int:
+        """Durably queue field updates; they reach the sink after earlier writes"""
+        return self._append([('update', dumps({'id': article_id, 'fields': fields}))
+                             for article_id, fields in updates.items()])
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Write everything queued so far now; False if the timeout ran out first.
+
+        Entries parked after too many failures no longer count as queued.
+        """
+        with self._cond:
+            self._waiters += 1
+            self._cond.notify_all()
+            try:
+                return self._cond.wait_for(lambda: not self._pending, timeout)
+            finally:
+                self._waiters -= 1
+
+    def _urgent(self) -> bool:
+        return self._stopped or (self._pending > 0 and (self._waiters > 0 or self._pending >= self.batch_size))
+
+    def _run(self):
+        failures = 0
+        while True:
+            with self._cond:
+                if failures:
+                    delay = min(self.interval * (2 ** failures), 60.0)
+                    self._cond.wait_for(lambda: self._stopped, delay)
+                else:
+                    self._cond.wait_for(self._urgent, self.interval)
+                if self._stopped:
+                    return
+                if not self._pending:
+                    continue
+            try:
+                done = self._flush_batch()
+                failures = 0
+            except Exception as e:
+                failures += 1
+                WRITE_BEHIND_FLUSHES.inc(result='error')
+                logger.error(f"Write-behind flush to {self.sink.name} failed (attempt {failures}): {e}")
+                done = self._park_exhausted(str(e))
+            if done:
+                with self._cond:
+                    self._pending -= done
+                    self._cond.notify_all()
+
+    def _head(self) -> List[Tuple[int, str, str, int]]:
+        """Oldest entries that share one op, so writes and updates never reorder"""
+        with self._lock:
+            rows = self._conn.execute('SELECT seq, op, payload, attempts FROM pending ORDER BY seq LIMIT ?',
+                                      (self.batch_size,)).fetchall()
+        head = []
+        for row in rows:
+            if row[1] != rows[0][1]:
+                break
+            head.append(row)
+        return head
+
+    def _flush_batch(self) -> int:
+        head = self._head()
+        if not head:
+            return 0
+        seqs = [row[0] for row in head]
+        with self._lock:
+            self._conn.execute(f"UPDATE pending SET attempts = attempts + 1 WHERE seq IN ({','.join('?' * len(seqs))})", seqs)
+            self._conn.commit()
+
+        if head[0][1] == 'write':
+            saved_ids, skipped = self.sink.write([loads(row[2]) for row in head])
+            self.written += len(saved_ids)
+            self.skipped += skipped
+            ARTICLES_WRITTEN.inc(len(saved_ids), sink=self.sink.name)
+            if self.on_written is not None:
+                self.on_written(saved_ids)
+        else:
+            updates: Dict[str, Dict] = {}
+            for row in head:
+                entry = loads(row[2])
+                updates.setdefault(entry['id'], {}).update(entry['fields'])
+            updated = self.sink.update(updates)
+            TRENDING_UPDATES.inc(len(updated), sink=self.sink.name)
+            if self.on_updated is not None:
+                self.on_updated({article_id: updates[article_id] for article_id in updated})
+
+        with self._lock:
+            self._conn.execute(f"DELETE FROM pending WHERE seq IN ({','.join('?' * len(seqs))})", seqs)
+            self._conn.commit()
+        WRITE_BEHIND_FLUSHES.inc(result='ok')
+        return len(seqs)
+
+    def _park_exhausted(self, error: str) -> int:
+        """Move entries out of the way once they used up their attempts"""
+        with self._lock:
+            parked = self._conn.execute('INSERT INTO dead (seq, op, payload, error, failed_at) '
+                                        'SELECT seq, op, payload, ?, ? FROM pending WHERE attempts >= ?',
+                                        (error, time.time(), self.max_attempts)).rowcount
+            if parked:
+                self._conn.execute('DELETE FROM pending WHERE attempts >= ?', (self.max_attempts,))
+            self._conn.commit()
+        if parked:
+            self.parked += parked
+            logger.error(f"Parked {parked} writes after {self.max_attempts} failed attempts; "
+                         f"they are retried on the next start")
+        return parked
+
+    def close(self, timeout: Optional[float] = WRITE_BEHIND_FLUSH_TIMEOUT) -> bool:
+        """Drain what it can within timeout and stop; returns True if nothing is left"""
+        drained = self.flush(timeout)
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join()
+        if not drained:
+            logger.warning(f"{self.pending} writes still pending in {self.path}; they are replayed on the next start")
+        with self._lock:
+            self._conn.close()
+        return drained
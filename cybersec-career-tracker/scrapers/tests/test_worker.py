@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Worker-mode article tasks: a failed write must be retried, not dropped"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+STATE_DIR = tempfile.mkdtemp(prefix='cybertrack-test-')
+for name, file_name in (('CATEGORY_CACHE_PATH', 'categories.sqlite3'), ('FEED_STATE_PATH', 'feed_state.json'),
+                        ('SEEN_INDEX_PATH', 'seen.sqlite3'), ('TRENDING_STATE_PATH', 'trending.sqlite3'),
+                        ('METRICS_FILE', 'metrics.prom')):
+    os.environ[name] = os.path.join(STATE_DIR, file_name)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fetcher import entry_to_payload  # noqa: E402
+from main import NewsScraperOrchestrator  # noqa: E402
+from sources.base import FeedSource  # noqa: E402
+from work_queue import Heartbeat, SqliteWorkQueue  # noqa: E402
+
+
+class WorkArticlesTest(unittest.TestCase):
+    def setUp(self):
+        self.orchestrator = NewsScraperOrchestrator(sink='sqlite', sqlite_path=os.path.join(STATE_DIR, 'articles.sqlite3'),
+                                                    write_behind=False)
+        # Entries carry everything parse_entry() needs, so nothing touches the network
+        self.source = FeedSource('Test Feed', 'http://127.0.0.1:9/feed').for_consumer('orchestrator')
+        self.orchestrator.scrapers = [self.source]
+        self.queue = SqliteWorkQueue(os.path.join(STATE_DIR, 'queue.sqlite3'))
+        self.heartbeat = Heartbeat(self.queue, 'test-worker')
+
+    def tearDown(self):
+        self.queue.close()
+        self.orchestrator.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(STATE_DIR, ignore_errors=True)
+
+    def _enqueue(self, link: str, title: str):
+        entry = {'title': title, 'link': link, 'summary': 'Attackers exploited CVE-2024-1234 at a hospital',
+                 'published': '2024-01-02T10:00:00Z'}
+        article_id = self.orchestrator.deduplicator.generate_article_id(link)
+        self.queue.enqueue('article', article_id, {'source': self.source.source_name, 'entry': entry_to_payload(entry)})
+        return article_id
+
+    def _work(self, pool):
+        return self.orchestrator._work_articles(self.queue, self.heartbeat, 'test-worker', pool)
+
+    def test_failed_write_is_saved_on_retry(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        article_id = self._enqueue('https://example.com/a', 'Hospital hit by ransomware')
+        store = self.orchestrator.store
+        write = store.write
+        store.write = lambda articles: (_ for _ in ()).throw(RuntimeError('storage unavailable'))
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            self.assertEqual(self._work(pool), 1)
+            self.assertEqual(self.queue.stats(), {'article': {'pending': 1}})
+            self.assertNotIn(article_id, self.orchestrator.deduplicator.existing_ids([article_id]))
+
+            # Make the retry due now and let the store recover
+            self.queue._transaction(lambda conn: conn.execute('UPDATE tasks SET not_before = 0'))
+            store.write = write
+            self.assertEqual(self._work(pool), 1)
+
+        self.assertEqual(self.queue.stats(), {'article': {'done': 1}})
+        rows = store._conn.execute('SELECT id FROM articles').fetchall()
+        self.assertEqual(rows, [(article_id,)])
+
+
+if __name__ == '__main__':
+    unittest.main()
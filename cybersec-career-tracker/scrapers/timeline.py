@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Feed date normalization and newest-first merging across feeds"""
+
+import calendar
+import heapq
+from datetime import datetime, timezone
+from email.utils import parsedate_tz, mktime_tz
+from typing import Callable, Iterable, List, Optional, TypeVar
+
+T = TypeVar('T')
+
+# feedparser fields in order of preference; all are UTC struct_time
+ENTRY_DATE_FIELDS = ('published_parsed', 'updated_parsed', 'created_parsed')
+
+_END = object()
+
+
+def entry_timestamp(entry) -> Optional[float]:
+    """Epoch seconds of a feed entry, or None if it carries no usable date.
+
+    feedparser already normalizes RFC-822, ISO 8601 and a dozen odder
+    formats into UTC struct_time values, so this never parses strings.
+    """
+    for field in ENTRY_DATE_FIELDS:
+        value = entry.get(field)
+        if value:
+            return float(calendar.timegm(value))
+    return None
+
+
+def parse_timestamp(value) -> Optional[float]:
+    """Epoch seconds from an already-exported value (number, RFC-822 or ISO string)"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
+    text = str(value).strip()
+    parsed = parsedate_tz(text)
+    if parsed:
+        return float(mktime_tz(parsed))
+    try:
+        moment = datetime.fromisoformat(text.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return (moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)).timestamp()
+
+
+def to_datetime(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+
+def to_iso(timestamp: float) -> str:
+    """ISO 8601 UTC string (what `new Date(...)` in the app expects)"""
+    return to_datetime(timestamp).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def merge_newest(streams: Iterable[Iterable[T]], key: Callable[[T], float],
+                 limit: Optional[int] = None) -> List[T]:
+    """K-way merge of newest-first streams, stopping after `limit` items.
+
+    Only the head of each stream sits in the heap, so producing K items from
+    F streams costs O(K log F) and stream items past the cut are never
+    pulled (streams may be lazy generators).
+    """
+    iterators = [iter(stream) for stream in streams]
+    heap = []
+    for index, iterator in enumerate(iterators):
+        item = next(iterator, _END)
+        if item is not _END:
+            heap.append((-key(item), index, item))
+    heapq.heapify(heap)
+
+    merged: List[T] = []
+    while heap and (limit is None or len(merged) < limit):
+        _, index, item = heap[0]
+        merged.append(item)
+        following = next(iterators[index], _END)
+        if following is _END:
+            heapq.heappop(heap)
+        else:
+            heapq.heapreplace(heap, (-key(following), index, following))
+    return merged
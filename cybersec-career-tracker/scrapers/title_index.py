@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""MinHash + LSH index for near-duplicate article titles"""
+
+import random
+import re
+import time
+import zlib
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Mersenne prime used for the universal hash family
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_TOKEN = re.compile(r'\S+')
+
+
+def title_tokens(title: str) -> Set[str]:
+    """Word set used for both MinHash and the exact Jaccard check"""
+    return set(_TOKEN.findall(title.lower()))
+
+
+def jaccard(tokens1: Set[str], tokens2: Set[str]) -> float:
+    if not tokens1 or not tokens2:
+        return 0.0
+    return len(tokens1 & tokens2) / len(tokens1 | tokens2)
+
+
+class TitleIndex:
+    """In-memory MinHash/LSH index over recent titles.
+
+    Titles are split into word sets (the same tokens the old Jaccard check
+    used), signed with num_perm MinHash values and bucketed by band. A query
+    only compares against titles that share at least one band bucket, and
+    candidates are confirmed with exact Jaccard, so lookups stay roughly
+    constant-time no matter how many titles are indexed.
+
+    With the defaults (16 bands x 8 rows) a pair at Jaccard 0.85 shares a
+    bucket with probability ~0.994, while a pair at 0.5 does so only ~6% of
+    the time, which keeps the exact checks per query small.
+    """
+
+    def __init__(self, threshold: float = 0.85, num_perm: int = 128, bands: int = 16, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+        self._buckets: List[Dict[Tuple[int, ...], Set[str]]] = [defaultdict(set) for _ in range(bands)]
+        self._entries: Dict[str, Tuple[Set[str], Tuple[int, ...], float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def _signature(self, tokens: Set[str]) -> Tuple[int, ...]:
+        hashes = [zlib.crc32(token.encode('utf-8')) for token in tokens]
+        return tuple(
+            min(((a * h + b) % _PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._perms
+        )
+
+    def _band_keys(self, signature: Tuple[int, ...]):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def add(self, key: str, title: str, timestamp: Optional[float] = None):
+        """Index a title under key (e.g. the article ID)"""
+        tokens = title_tokens(title)
+        if not tokens or key in self._entries:
+            return
+        signature = self._signature(tokens)
+        self._entries[key] = (tokens, signature, timestamp if timestamp is not None else time.time())
+        for band, band_key in self._band_keys(signature):
+            self._buckets[band][band_key].add(key)
+
+    def remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for band, band_key in self._band_keys(entry[1]):
+            bucket = self._buckets[band].get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band][band_key]
+
+    def prune(self, older_than: float) -> int:
+        """Drop titles indexed before the given timestamp; returns how many"""
+        stale = [key for key, entry in self._entries.items() if entry[2] < older_than]
+        for key in stale:
+            self.remove(key)
+        return len(stale)
+
+    def find_similar(self, title: str) -> Optional[str]:
+        """Return the key of an indexed title at or above the threshold, if any"""
+        tokens = title_tokens(title)
+        if not tokens:
+            return None
+        signature = self._signature(tokens)
+        checked: Set[str] = set()
+        for band, band_key in self._band_keys(signature):
+            for key in self._buckets[band].get(band_key, ()):
+                if key in checked:
+                    continue
+                checked.add(key)
+                if jaccard(tokens, self._entries[key][0]) > self.threshold:
+                    return key
+        return None
+
+    def load(self, items: Iterable[Tuple[str, str, Optional[float]]]) -> int:
+        """Bulk-add (key, title, timestamp) tuples; returns how many were indexed"""
+        before = len(self._entries)
+        for key, title, timestamp in items:
+            self.add(key, title, timestamp)
+        return len(self._entries) - before
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""Incremental sliding-window trending scores computed at ingest"""
+
+import heapq
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from deduplicator import generate_article_id
+from timeline import parse_timestamp
+from title_index import TitleIndex
+
+TRENDING_STATE_PATH = os.getenv('TRENDING_STATE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.trending.sqlite3'))
+TRENDING_MIN_SCORE = float(os.getenv('TRENDING_MIN_SCORE', '2.0'))
+# Headlines of one story differ far more between outlets than reposts do
+STORY_SIMILARITY = float(os.getenv('STORY_SIMILARITY', '0.5'))
+
+HOUR = 3600
+WINDOWS = (6 * HOUR, 24 * HOUR, 72 * HOUR)
+WINDOW_WEIGHTS = (1.0, 0.5, 0.25)
+# Attack types and organizations are shared by unrelated stories, so count less
+KIND_WEIGHTS = {'story': 1.0, 'cve': 1.0, 'keyword': 0.5}
+
+
+class SlidingSourceCounter:
+    """Distinct sources per key over several trailing windows.
+
+    Only the latest mention per (key, source) matters. Each time it moves
+    forward an expiry is pushed per window; expire() pops the due ones and
+    decrements a window only if that mention is still the latest, so counts
+    are maintained in O(log n) per mention without ever rescanning.
+    """
+
+    def __init__(self, windows: Tuple[int, ...] = WINDOWS):
+        self.windows = windows
+        self._latest: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._counts: Dict[str, List[int]] = {}
+        self._expiry: List[Tuple[float, str, str, int]] = []
+
+    def counts(self, key: str) -> Tuple[int, ...]:
+        return tuple(self._counts.get(key, (0,) * len(self.windows)))
+
+    def add(self, key: str, source: str, timestamp: float, now: float) -> bool:
+        """Record a mention; returns True if any window count changed"""
+        self.expire(now)
+        if timestamp <= now - self.windows[-1]:
+            return False
+        previous = self._latest[key].get(source)
+        if previous is not None and previous >= timestamp:
+            return False
+
+        counts = self._counts.setdefault(key, [0] * len(self.windows))
+        changed = False
+        for index, window in enumerate(self.windows):
+            if timestamp <= now - window:
+                continue
+            heapq.heappush(self._expiry, (timestamp + window, key, source, index))
+            if previous is None or previous <= now - window:
+                counts[index] += 1
+                changed = True
+        self._latest[key][source] = timestamp
+        return changed
+
+    def expire(self, now: float) -> Set[str]:
+        """Drop mentions that slid out of their windows; returns the keys that changed"""
+        changed = set()
+        last = len(self.windows) - 1
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, key, source, index = heapq.heappop(self._expiry)
+            latest = self._latest.get(key, {}).get(source)
+            if latest is None or latest + self.windows[index] != expires_at:
+                continue  # A newer mention from this source superseded it
+            self._counts[key][index] -= 1
+            changed.add(key)
+            if index == last:
+                del self._latest[key][source]
+                if not self._latest[key]:
+                    del self._latest[key]
+                    del self._counts[key]
+        return changed
+
+
+class TrendTracker:
+    """Scores articles by how many independent sources cover the same
+    story, CVE or keyword in the last 6, 24 and 72 hours.
+
+    observe() stamps trending/trendingScore on an article as it is ingested
+    and marks every article sharing one of its keys as dirty.
+    pending_updates() returns the stored articles whose score changed since
+    it was last written, ready for one bulk write. Mentions are kept in
+    SQLite so the windows survive between runs.
+    """
+
+    def __init__(self, path: str = TRENDING_STATE_PATH, min_score: float = TRENDING_MIN_SCORE,
+                 story_similarity: float = STORY_SIMILARITY):
+        self.min_score = min_score
+        self.counter = SlidingSourceCounter()
+        # 32 bands x 4 rows: titles at Jaccard 0.5 share a bucket ~87% of the time
+        self.stories = TitleIndex(threshold=story_similarity, bands=32)
+        self._story_of: Dict[str, str] = {}
+        self._articles_by_key: Dict[str, Set[str]] = defaultdict(set)
+        self._keys_of: Dict[str, Set[str]] = defaultdict(set)
+        self._published: Dict[str, float] = {}
+        self._written: Dict[str, float] = {}
+        self._dirty: Set[str] = set()
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS mentions (key TEXT, article_id TEXT, source TEXT, ts REAL, '
+                           'PRIMARY KEY (key, article_id)) WITHOUT ROWID')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS stories (article_id TEXT PRIMARY KEY, story TEXT, title TEXT, ts REAL)')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS scores (article_id TEXT PRIMARY KEY, score REAL)')
+        self._conn.commit()
+        self._load(time.time())
+
+    def _load(self, now: float):
+        cutoff = now - WINDOWS[-1]
+        for article_id, story, title, ts in self._conn.execute(
+                'SELECT article_id, story, title, ts FROM stories WHERE ts > ?', (cutoff,)):
+            self._story_of[article_id] = story
+            self.stories.add(article_id, title, ts)
+        rows = self._conn.execute('SELECT key, article_id, source, ts FROM mentions WHERE ts > ? ORDER BY ts', (cutoff,))
+        for key, article_id, source, ts in rows:
+            self._index(key, article_id, source, ts, now)
+        self._written = dict(self._conn.execute('SELECT article_id, score FROM scores'))
+
+    def _index(self, key: str, article_id: str, source: str, ts: float, now: float):
+        self.counter.add(key, source, ts, now)
+        self._articles_by_key[key].add(article_id)
+        self._keys_of[article_id].add(key)
+        self._published[article_id] = ts
+
+    def _story(self, article_id: str, title: str, ts: float) -> str:
+        """Story ID of the closest recent headline, or a new story led by this article"""
+        if article_id in self._story_of:
+            return self._story_of[article_id]
+        similar = self.stories.find_similar(title)
+        story = self._story_of.get(similar, similar) if similar else article_id
+        self._story_of[article_id] = story
+        self.stories.add(article_id, title, ts)
+        self._conn.execute('INSERT OR REPLACE INTO stories (article_id, story, title, ts) VALUES (?, ?, ?, ?)',
+                           (article_id, story, title, ts))
+        return story
+
+    @staticmethod
+    def _keywords(article: Dict) -> List[str]:
+        return list(article.get('attackTypes') or []) + list(article.get('organizations') or [])
+
+    def score(self, article_id: str) -> float:
+        """Best weighted count of other sources across the article's keys"""
+        best = 0.0
+        for key in self._keys_of.get(article_id, ()):
+            kind_weight = KIND_WEIGHTS[key.split(':', 1)[0]]
+            counts = self.counter.counts(key)
+            value = sum(weight * max(0, count - 1) for weight, count in zip(WINDOW_WEIGHTS, counts))
+            best = max(best, kind_weight * value)
+        return round(best, 2)
+
+    def observe(self, article: Dict, now: Optional[float] = None) -> float:
+        """Count an article's mentions and set its trending fields"""
+        now = time.time() if now is None else now
+        article_id = generate_article_id(article['url'])
+        source = article.get('sourceName', '')
+        published = parse_timestamp(article.get('publishedDate'))
+        ts = min(published, now) if published is not None else now
+
+        with self._lock:
+            keys = [f"story:{self._story(article_id, article.get('title', ''), ts)}"]
+            keys += [f"cve:{cve}" for cve in article.get('cveIds') or []]
+            keys += [f"keyword:{keyword.lower()}" for keyword in self._keywords(article)]
+            rows = []
+            for key in dict.fromkeys(keys):
+                self._index(key, article_id, source, ts, now)
+                self._dirty.add(key)
+                rows.append((key, article_id, source, ts))
+            score = self.score(article_id)
+            self._written[article_id] = score  # Goes out with the article itself
+            self._conn.executemany('INSERT OR REPLACE INTO mentions (key, article_id, source, ts) VALUES (?, ?, ?, ?)', rows)
+            self._conn.execute('INSERT OR REPLACE INTO scores (article_id, score) VALUES (?, ?)', (article_id, score))
+            self._conn.commit()
+        article['trendingScore'] = score
+        article['trending'] = score >= self.min_score
+        return score
+
+    def observe_many(self, articles: Iterable[Dict], now: Optional[float] = None):
+        for article in articles:
+            self.observe(article, now)
+
+    def pending_updates(self, now: Optional[float] = None) -> Dict[str, Dict]:
+        """Articles whose score changed since it was last written.
+
+        Articles older than the widest window get a final update and are
+        then forgotten, so nothing stays flagged as trending forever.
+        """
+        now = time.time() if now is None else now
+        cutoff = now - WINDOWS[-1]
+        with self._lock:
+            keys = self._dirty | self.counter.expire(now)
+            self._dirty = set()
+            affected = set()
+            for key in keys:
+                affected.update(self._articles_by_key.get(key, ()))
+            stale = {article_id for article_id, ts in self._published.items() if ts <= cutoff}
+
+            updates = {}
+            for article_id in affected | stale:
+                score = 0.0 if article_id in stale else self.score(article_id)
+                if self._written.get(article_id, 0.0) != score:
+                    updates[article_id] = {'trending': score >= self.min_score, 'trendingScore': score}
+            for article_id in stale:
+                self._forget(article_id)
+            self._conn.execute('DELETE FROM mentions WHERE ts <= ?', (cutoff,))
+            self._conn.execute('DELETE FROM stories WHERE ts <= ?', (cutoff,))
+            self._conn.commit()
+        return updates
+
+    def _forget(self, article_id: str):
+        for key in self._keys_of.pop(article_id, ()):
+            articles = self._articles_by_key.get(key)
+            if articles is not None:
+                articles.discard(article_id)
+                if not articles:
+                    del self._articles_by_key[key]
+        self._published.pop(article_id, None)
+        self._written.pop(article_id, None)
+        self._conn.execute('DELETE FROM scores WHERE article_id = ?', (article_id,))
+        if self._story_of.pop(article_id, None) is not None:
+            self.stories.remove(article_id)
+
+    def mark_written(self, updates: Dict[str, Dict]):
+        """Remember the scores that reached storage"""
+        with self._lock:
+            written = [(article_id, fields['trendingScore']) for article_id, fields in updates.items()
+                       if article_id in self._published]
+            self._written.update(written)
+            self._conn.executemany('INSERT OR REPLACE INTO scores (article_id, score) VALUES (?, ?)', written)
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""Lease-based task queue for sharding scraping across worker processes"""
+
+import abc
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Set
+
+logger = logging.getLogger(__name__)
+
+WORK_QUEUE_URL = os.getenv('WORK_QUEUE_URL', 'sqlite:///' + os.path.join(os.path.dirname(os.path.abspath(__file__)), '.work_queue.sqlite3'))
+LEASE_SECONDS = float(os.getenv('LEASE_SECONDS', '60'))
+MAX_ATTEMPTS = int(os.getenv('TASK_MAX_ATTEMPTS', '5'))
+# Finished tasks are kept this long (seconds) before workers prune them
+DONE_RETENTION = float(os.getenv('TASK_DONE_RETENTION', '86400'))
+
+
+class Task(NamedTuple):
+    id: int
+    kind: str       # 'source' or 'article'
+    key: str        # Unique per kind: source name, article ID
+    payload: Dict
+    token: int      # Fencing token, bumped on every lease
+    attempts: int
+
+
+class WorkQueue(abc.ABC):
+    """Interface every queue backend implements.
+
+    A task is leased by one worker at a time. The lease expires unless the
+    worker renews it (see Heartbeat), after which another worker may take
+    the task over. complete(), renew() and fail() only succeed for the
+    current holder: each lease bumps the task's token, so a worker that
+    stalled past its lease cannot finish a task someone else now owns.
+    (kind, key) is unique, so enqueueing work that is already queued or
+    done is a no-op.
+    """
+
+    @abc.abstractmethod
+    def enqueue(self, kind: str, key: str, payload: Optional[Dict] = None, not_before: float = 0) -> bool:
+        """Add a task unless (kind, key) exists; returns True if it was added"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def lease(self, owner: str, limit: int = 1, lease_seconds: float = LEASE_SECONDS,
+              kinds: Optional[Sequence[str]] = None) -> List[Task]:
+        """Claim up to limit ready tasks (pending and due, or with an expired lease)"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def renew(self, owner: str, tasks: Iterable[Task], lease_seconds: float = LEASE_SECONDS) -> Set[int]:
+        """Extend leases; returns the IDs of the tasks still held"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def complete(self, owner: str, task: Task, reschedule_at: Optional[float] = None,
+                 payload: Optional[Dict] = None) -> bool:
+        """Finish a task, or put a recurring one back to run at reschedule_at"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def fail(self, owner: str, task: Task, error: str, retry_in: float = 60) -> bool:
+        """Release a task to be retried later (dead after max_attempts)"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Task counts by kind and status"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def prune(self, done_before: float) -> int:
+        """Forget finished tasks older than done_before"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SqliteWorkQueue(WorkQueue):
+    """WorkQueue in one SQLite file, shared by worker processes on a host.
+
+    Leasing runs inside BEGIN IMMEDIATE, so two processes can never claim
+    the same task. SQLite over a network filesystem is not safe; workers on
+    several nodes need a networked backend (see register_backend).
+    """
+
+    def __init__(self, path: str, max_attempts: int = MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY,
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            not_before REAL NOT NULL DEFAULT 0,
+            owner TEXT,
+            token INTEGER NOT NULL DEFAULT 0,
+            lease_expires REAL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            error TEXT,
+            updated_at REAL,
+            UNIQUE (kind, key))''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS tasks_ready ON tasks (status, not_before)')
+
+    def _transaction(self, fn: Callable[[sqlite3.Connection], object]):
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                result = fn(self._conn)
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+            return result
+
+    def enqueue(self, kind: str, key: str, payload: Optional[Dict] = None, not_before: float = 0) -> bool:
+        def insert(conn):
+            cursor = conn.execute('INSERT OR IGNORE INTO tasks (kind, key, payload, not_before, updated_at) '
+                                  'VALUES (?, ?, ?, ?, ?)', (kind, key, json.dumps(payload or {}), not_before, time.time()))
+            return cursor.rowcount == 1
+        return self._transaction(insert)
+
+    def lease(self, owner: str, limit: int = 1, lease_seconds: float = LEASE_SECONDS,
+              kinds: Optional[Sequence[str]] = None) -> List[Task]:
+        now = time.time()
+        kind_filter = f" AND kind IN ({','.join('?' * len(kinds))})" if kinds else ''
+
+        def claim(conn):
+            # A task whose lease keeps expiring is probably crashing its workers
+            conn.execute("UPDATE tasks SET status = 'dead', error = 'lease expired too often', updated_at = ? "
+                         "WHERE status = 'leased' AND lease_expires <= ? AND attempts >= ?",
+                         (now, now, self.max_attempts))
+            rows = conn.execute(
+                "SELECT id FROM tasks WHERE ((status = 'pending' AND not_before <= ?) "
+                "OR (status = 'leased' AND lease_expires <= ?))" + kind_filter +
+                " ORDER BY not_before, id LIMIT ?", (now, now, *(kinds or ()), max(1, limit))).fetchall()
+            ids = [row[0] for row in rows]
+            if not ids:
+                return []
+            placeholders = ','.join('?' * len(ids))
+            conn.execute(f"UPDATE tasks SET status = 'leased', owner = ?, token = token + 1, lease_expires = ?, "
+                         f"attempts = attempts + 1, updated_at = ? WHERE id IN ({placeholders})",
+                         (owner, now + lease_seconds, now, *ids))
+            return conn.execute(f"SELECT id, kind, key, payload, token, attempts FROM tasks "
+                                f"WHERE id IN ({placeholders}) ORDER BY not_before, id", ids).fetchall()
+
+        return [Task(row[0], row[1], row[2], json.loads(row[3]), row[4], row[5]) for row in self._transaction(claim)]
+
+    def renew(self, owner: str, tasks: Iterable[Task], lease_seconds: float = LEASE_SECONDS) -> Set[int]:
+        tasks = list(tasks)
+        expires = time.time() + lease_seconds
+
+        def extend(conn):
+            held = set()
+            for task in tasks:
+                cursor = conn.execute("UPDATE tasks SET lease_expires = ? WHERE id = ? AND owner = ? AND token = ? "
+                                      "AND status = 'leased'", (expires, task.id, owner, task.token))
+                if cursor.rowcount:
+                    held.add(task.id)
+            return held
+        return self._transaction(extend) if tasks else set()
+
+    def _finish(self, owner: str, task: Task, assignments: str, values: Sequence) -> bool:
+        def update(conn):
+            cursor = conn.execute(f"UPDATE tasks SET {assignments}, owner = NULL, lease_expires = NULL, updated_at = ? "
+                                  f"WHERE id = ? AND owner = ? AND token = ? AND status = 'leased'",
+                                  (*values, time.time(), task.id, owner, task.token))
+            return cursor.rowcount == 1
+        return self._transaction(update)
+
+    def complete(self, owner: str, task: Task, reschedule_at: Optional[float] = None,
+                 payload: Optional[Dict] = None) -> bool:
+        payload_json = json.dumps(task.payload if payload is None else payload)
+        if reschedule_at is None:
+            return self._finish(owner, task, "status = 'done', payload = ?, error = NULL", (payload_json,))
+        return self._finish(owner, task, "status = 'pending', payload = ?, not_before = ?, attempts = 0, error = NULL",
+                            (payload_json, reschedule_at))
+
+    def fail(self, owner: str, task: Task, error: str, retry_in: float = 60) -> bool:
+        if task.attempts >= self.max_attempts:
+            return self._finish(owner, task, "status = 'dead', error = ?", (error,))
+        return self._finish(owner, task, "status = 'pending', error = ?, not_before = ?",
+                            (error, time.time() + retry_in))
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            rows = self._conn.execute('SELECT kind, status, COUNT(*) FROM tasks GROUP BY kind, status').fetchall()
+        stats: Dict[str, Dict[str, int]] = {}
+        for kind, status, count in rows:
+            stats.setdefault(kind, {})[status] = count
+        return stats
+
+    def prune(self, done_before: float) -> int:
+        return self._transaction(lambda conn: conn.execute(
+            "DELETE FROM tasks WHERE status = 'done' AND updated_at < ?", (done_before,)).rowcount)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Queue backends by URL scheme; register_backend() adds e.g. a Redis or Firestore one
+BACKENDS: Dict[str, Callable[[str], WorkQueue]] = {
+    'sqlite': lambda location: SqliteWorkQueue(location),
+}
+
+
+def register_backend(scheme: str, factory: Callable[[str], WorkQueue]):
+    """Make open_queue() accept `<scheme>://...` URLs (factory gets the part after ://)"""
+    BACKENDS[scheme] = factory
+
+
+def open_queue(url: str = WORK_QUEUE_URL) -> WorkQueue:
+    """Open a queue from a URL such as sqlite:///path/to/queue.sqlite3"""
+    scheme, separator, location = url.partition('://')
+    if not separator:
+        scheme, location = 'sqlite', url
+    factory = BACKENDS.get(scheme)
+    if factory is None:
+        raise ValueError(f"no work queue backend for {scheme}:// (known: {', '.join(sorted(BACKENDS))})")
+    return factory(location)
+
+
+class Heartbeat:
+    """Background thread that keeps renewing a worker's leases.
+
+    Leases are renewed every third of lease_seconds, so a worker has to miss
+    two beats in a row before its tasks are handed to someone else. Tasks
+    whose renewal fails are reported by lost() and must not be written.
+    """
+
+    def __init__(self, queue: WorkQueue, owner: str, lease_seconds: float = LEASE_SECONDS):
+        self.queue = queue
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+        self._held: Dict[int, Task] = {}
+        self._lost: Set[int] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'Heartbeat':
+        self._thread = threading.Thread(target=self._run, name='heartbeat', daemon=True)
+        self._thread.start()
+        return self
+
+    def track(self, tasks: Iterable[Task]):
+        with self._lock:
+            for task in tasks:
+                self._held[task.id] = task
+                self._lost.discard(task.id)
+
+    def untrack(self, tasks: Iterable[Task]):
+        with self._lock:
+            for task in tasks:
+                self._held.pop(task.id, None)
+
+    def lost(self, task: Task) -> bool:
+        with self._lock:
+            return task.id in self._lost
+
+    def beat(self):
+        with self._lock:
+            tasks = list(self._held.values())
+        if not tasks:
+            return
+        try:
+            held = self.queue.renew(self.owner, tasks, self.lease_seconds)
+        except Exception as e:
+            logger.error(f"Lease renewal failed: {e}")
+            return
+        with self._lock:
+            for task in tasks:
+                if task.id not in held and task.id in self._held:
+                    logger.warning(f"Lost lease on {task.kind} task {task.key}")
+                    self._lost.add(task.id)
+                    del self._held[task.id]
+
+    def _run(self):
+        while not self._stop.wait(self.lease_seconds / 3):
+            self.beat()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()